@@ -2,12 +2,14 @@
 chunking helper
 '''
 import directdemod.constants as constants
+import directdemod.workspace as workspace
 import math
 
 '''
 This object is just to help in chunking process
 It is responsible for creating chunks of the signal and store the info to be used later
 It can be helpful for avoiding border issues in filters and demods
+It also carries a workspace, so that every chunk reuses the same scratch buffers
 '''
 
 # POSSIBLE TODO: automatic distinction in get/set for every cycle. will avoid need of 'uniq'
@@ -18,15 +20,20 @@ class chunker:
     This object is just to help in chunking process
     '''
 
-    def __init__(self, sigsrc, chunkSize = constants.PROC_CHUNKSIZE):
+    def __init__(self, sigsrc, chunkSize = constants.PROC_CHUNKSIZE, workspaceObj = None):
 
         '''Initialize the object
 
         Args:
             sampRate (:obj:`commSignal`): commSignal object to be chunked
             chunkSize (:obj:`int`, optional): chunk size
+            workspaceObj (:obj:`workspace`, optional): workspace to borrow scratch buffers from, a new one is created if not given
         '''
 
+        self.__workspace = workspaceObj
+        if self.__workspace is None:
+            self.__workspace = workspace.workspace()
+
         self.__nChunks = math.ceil(sigsrc.length*1.0/chunkSize)
         self.__chunks = []
         self.__vars = {}
@@ -51,6 +58,13 @@ class chunker:
 
         return self.__chunks
 
+    @property
+    def workspace(self):
+
+        ''':obj:`workspace`: get the workspace with the scratch buffers of this chunking process'''
+
+        return self.__workspace
+
     def set(self, name, value):
 
         '''set a variable for to be used during chunking
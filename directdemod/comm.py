@@ -5,6 +5,7 @@ Signal utilities
 import directdemod.constants as constants
 import numpy as np
 import scipy.signal as signal
+import tempfile, logging
 
 
 '''
@@ -18,26 +19,28 @@ class commSignal:
     This is an object used to store a signal and its properties
     '''
 
-    def __init__(self, sampRate, sig = np.array([]), chunker = None):
+    def __init__(self, sampRate, sig = np.array([]), chunker = None, spillThreshold = constants.COMM_SPILLTHRESHOLD):
 
         '''Initialize the object
 
         Args:
             sampRate (:obj:`int`): sampling rate in Hz, will be forced to be an integer
-            sig (:obj:`numpy array`, optional): must be one dimentional, will be forced to be a numpy array
+            sig (:obj:`numpy array`, optional): must be one dimentional, will be forced to be a numpy array (a chunked signal uses a given array as its scratch space instead of copying it)
             chunker (:obj:`chunker`, optional): Chunking object, if this signal is going to be processed in chunks
+            spillThreshold (:obj:`int`, optional): size in bytes above which the signal is moved to a temporary file backed store, None keeps it in memory always
         '''
         self.__chunker = chunker
-
-        self.__len = len(sig)
+        self.__spillThreshold = spillThreshold
+        self.__spilled = False
 
         self.__sampRate = int(sampRate)
         if self.__sampRate <= 0:
             raise ValueError("The sampling rate must be greater than zero")
 
-        self.__sig = np.array(sig)
-        if not self.__sig.size == self.__sig.shape[0]:
+        sig = self.__own(sig)
+        if not sig.size == sig.shape[0]:
             raise TypeError("The signal array must be 1-D")
+        self.__store(sig)
 
     @property
     def length(self):
@@ -58,23 +61,61 @@ class commSignal:
 
         ''':obj:`numpy array`: get signal'''
 
-        return self.__sig
+        return self.__buf[:self.__len]
+
+    @property
+    def spilled(self):
+
+        ''':obj:`bool`: whether the signal was moved to a disk backed store at any point'''
+
+        return self.__spilled
 
     def offsetFreq(self, freqOffset):
 
         '''Offset signal by a frequency by multiplying a complex envelope
 
+        The phase of the envelope is the integral of the offset, carried from chunk to chunk
+
         Args:
-            freqOffset (:obj:`float`): offset frequency in Hz
+            freqOffset (:obj:`float`): offset frequency in Hz, or a numpy array of one offset per sample (e.g. a doppler correction)
 
         Returns:
             :obj:`commSignal`: Signal offset by given frequency (self)
         '''
-        offset = 0
-        if not self.__chunker is None:
-            offset = self.__chunker.get(constants.CHUNK_FREQOFFSET, 0)
-            self.__chunker.set(constants.CHUNK_FREQOFFSET, offset + self.length)
-        self.__sig *= np.exp(-1.0j*2.0*np.pi*freqOffset*np.arange(offset, offset + self.length)/self.sampRate)
+        sig = self.signal
+        if self.__chunker is None:
+            if np.isscalar(freqOffset):
+                cycles = freqOffset*np.arange(self.length)/self.sampRate
+            else:
+                cycles = (np.cumsum(freqOffset) - freqOffset)/self.sampRate
+            sig *= np.exp(-1.0j*2.0*np.pi*cycles)
+        else:
+            # build the oscillator block by block in small reused buffers of the chunker's workspace,
+            # the phase at the start of the chunk (in cycles) is kept by the chunker
+            start = self.__chunker.get(constants.CHUNK_FREQOFFSET, 0.0)
+            ws = self.__chunker.workspace
+            blockSize = constants.PROC_BLOCKSIZE
+            oscType = np.result_type(sig.dtype, np.complex64)
+            for i in range(0, self.length, blockSize):
+                n = min(blockSize, self.length - i)
+                phase = ws.get("offsetFreq.phase", n, np.float64)
+                if np.isscalar(freqOffset):
+                    np.multiply(ws.ramp(n), freqOffset/self.sampRate, out = phase)
+                    step = freqOffset*n/self.sampRate
+                else:
+                    f = freqOffset[i:i + n]
+                    np.cumsum(f, out = phase)
+                    step = phase[-1]/self.sampRate
+                    np.subtract(phase, f, out = phase)
+                    np.divide(phase, self.sampRate, out = phase)
+                np.add(phase, start, out = phase)
+                start = (start + step) % 1.0
+                np.multiply(phase, -2.0*np.pi, out = phase)
+                osc = ws.get("offsetFreq.osc", n, oscType)
+                np.cos(phase, out = osc.real)
+                np.sin(phase, out = osc.imag)
+                sig[i:i + n] *= osc
+            self.__chunker.set(constants.CHUNK_FREQOFFSET, start)
         return self
 
     def filter(self, filt):
@@ -111,9 +152,8 @@ class commSignal:
 
             # will be depreciated later on, try not to use
 
-            self.__sig = signal.resample(self.signal, int(tsampRate * self.length/self.sampRate))
+            self.__store(signal.resample(self.signal, int(tsampRate * self.length/self.sampRate)))
             self.__sampRate = tsampRate
-            self.__len = len(self.signal)
 
         else:
             jumpIndex = int(self.sampRate / tsampRate)
@@ -124,9 +164,29 @@ class commSignal:
                 nextOff = (jumpIndex - (self.length - offset)%jumpIndex)%jumpIndex
                 self.__chunker.set(constants.CHUNK_BWLIM + uniq, nextOff)
 
-            self.__sig = self.signal[offset::jumpIndex]
+            self.__buf = self.signal[offset::jumpIndex]
+            self.__len = len(self.__buf)
             self.__sampRate = int(self.sampRate/jumpIndex)
-            self.__len = len(self.signal)
+        return self
+
+    def decimate(self, dec):
+
+        '''Filter and downsample the signal in one pass with a decimating filter
+
+        Args:
+            dec (:obj:`decimator`): decimating filter object, e.g. filters.xlatingDecimator. Its state carries over between chunks, it must provide outputType and take an out array
+
+        Returns:
+            :obj:`commSignal`: Updated signal (self)
+        '''
+
+        if self.__chunker is None:
+            self.updateSignal(dec.applyOn(self.signal))
+        else:
+            # the output is written to a reused buffer of the chunker's workspace
+            out = self.__chunker.workspace.get("decimate", -(-self.length // dec.decimation), dec.outputType(self.signal.dtype))
+            self.updateSignal(dec.applyOn(self.signal, out))
+        self.__sampRate = int(self.sampRate / dec.decimation)
         return self
 
     def funcApply(self, func):
@@ -160,7 +220,7 @@ class commSignal:
         if not self.__sampRate == sig.sampRate:
             raise TypeError("Signals must have same sampling rate to be extended")
         
-        self.updateSignal(np.concatenate([self.signal, sig.signal]))
+        self.__append(sig.signal)
         return self
 
     def updateSignal(self, sig):
@@ -174,8 +234,82 @@ class commSignal:
             :obj:`commSignal`: Updated signal (self)
         '''
 
-        self.__sig = np.array(sig)
-        if not self.__sig.size <= self.__sig.shape[0]:
+        sig = self.__own(sig)
+        if not sig.size <= sig.shape[0]:
             raise TypeError("The signal array must be 1-D")
-        self.__len = len(self.signal)
-        return self
\ No newline at end of file
+        self.__store(sig)
+        return self
+
+    def __own(self, sig):
+
+        ''' Gets an array that this object may modify, chunked signals avoid the copy
+
+        Args:
+            sig (:obj:`numpy array`): Given signal array
+
+        Returns:
+            :obj:`numpy array`: Array owned by this object
+        '''
+
+        if self.__chunker is None:
+            return np.array(sig)
+        return np.asarray(sig)
+
+    def __store(self, sig):
+
+        ''' Makes the given array the signal, moving it to disk if it is too big
+
+        Args:
+            sig (:obj:`numpy array`): New signal array, owned by this object from now on
+        '''
+
+        if not self.__spillThreshold is None and sig.nbytes > self.__spillThreshold:
+            buf = self.__allocate(len(sig), sig.dtype)
+            buf[:] = sig
+            sig = buf
+
+        self.__buf = sig
+        self.__len = len(sig)
+
+    def __append(self, sig):
+
+        ''' Appends an array at the tail end, growing the storage geometrically so that appends are amortized
+
+        Args:
+            sig (:obj:`numpy array`): Array to be appended
+        '''
+
+        newLen = self.__len + len(sig)
+        dtype = np.result_type(self.__buf, sig)
+
+        # the storage can only have spare room if it was allocated here, so writing into it is safe
+        if newLen > len(self.__buf) or not dtype == self.__buf.dtype:
+            buf = self.__allocate(max(newLen, 2 * len(self.__buf)), dtype)
+            buf[:self.__len] = self.signal
+            self.__buf = buf
+
+        self.__buf[self.__len:newLen] = sig
+        self.__len = newLen
+
+    def __allocate(self, size, dtype):
+
+        ''' Allocates storage, in memory if it is below the spill threshold else as a memmap on a temporary file
+
+        Args:
+            size (:obj:`int`): number of elements
+            dtype (:obj:`numpy dtype`): data type of the elements
+
+        Returns:
+            :obj:`numpy array`: Uninitialized storage
+        '''
+
+        if self.__spillThreshold is None or size * np.dtype(dtype).itemsize <= self.__spillThreshold:
+            return np.empty(size, dtype = dtype)
+
+        if not self.__spilled:
+            logging.info('Signal exceeded %d bytes, moving it to a disk backed store', self.__spillThreshold)
+        self.__spilled = True
+
+        # the file is already unlinked, the mapping keeps it alive until the storage is released
+        with tempfile.TemporaryFile(dir = constants.COMM_SPILLDIR) as spillFile:
+            return np.memmap(spillFile, dtype = dtype, mode = 'w+', shape = (size,))
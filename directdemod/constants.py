@@ -6,22 +6,90 @@ IQ_SDRSAMPRATE = 2.048e6
 
 ## Processing settings
 PROC_CHUNKSIZE = 20000000
+PROC_BLOCKSIZE = 65536 # block size of inner loops that work on cache sized pieces of a chunk
+
+## Signal storage settings
+COMM_SPILLTHRESHOLD = 512*1024*1024 # signals bigger than this (in bytes) are moved to a disk backed store, None disables it
+COMM_SPILLDIR = None # directory for the disk backed store, system temp directory if None
 
 ## NOAA settings
 NOAA_FMBW = 60000
+NOAA_FMPASSBAND = 20000 # edge of the pass band of the FM channel filter
 NOAA_AUDSAMPRATE = 20800
 NOAA_FREQ = 137620000
-NOAA_CRUDESYNCSAMPRATE = 40960
+NOAA_CRUDESYNCSAMPRATE = 40960 # rate of the audio the crude sync envelope is made from, the syncs themselves are at NOAA_CRUDESYNCOVERSAMPLE samples per word
+NOAA_CRUDESYNCOVERSAMPLE = 10 # APT envelope for crude sync is at this many samples per word
+NOAA_IMAGEOVERSAMPLE = 5 # APT envelope for the image is at this many samples per word
+NOAA_COARSESYNCOVERSAMPLE = 2 # syncs are first found in an APT envelope at this many samples per word, then located at NOAA_CRUDESYNCOVERSAMPLE
+NOAA_SYNCREFINEWIDTH = 4 # syncs found at the coarse rate are searched for this many coarse samples either way
+NOAA_SYNCREFINEPAD = 16 # coarse samples on either side of the sync search windows, for the interpolation filter
+NOAA_SYNCTRACKING = True # crude syncs are tracked from line to line instead of searched for in the whole pass
+NOAA_TRACKACQUIRE = 5 # seconds of full search to acquire lock
+NOAA_TRACKLOCKSYNCS = 4 # syncs spaced by a line needed for lock
+NOAA_TRACKTOLERANCE = 2 # words by which sync spacing may differ from a line during acquisition
+NOAA_TRACKWIDTH = 8 # samples searched either side of a predicted sync
+NOAA_TRACKMINPEAK = 0.5 # a sync is found if its correlation is this far from the typical correlation to the height of the syncs at lock
+NOAA_TRACKMAXMISSES = 3 # lock is lost after this many syncs in a row are not found
+NOAA_TRACKGAIN = 0.1 # weight of a new line period in the running estimate
+NOAA_CRUDESYNCPASSBAND = 1200 # bandwidth of the APT envelope for crude sync, enough for the 1040 Hz sync pulses
 NOAA_T = 1.0/4160 #Time of one bit
 NOAA_SYNCA = [0, 0, 0, 0, 1, 1, 0, 0, 1, 1, 0, 0, 1, 1, 0, 0, 1, 1, 0, 0, 1, 1, 0, 0, 1, 1, 0, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
 NOAA_SYNCB = [0, 0, 0, 0, 1, 1, 1, 0, 0, 1, 1, 1, 0, 0, 1, 1, 1, 0, 0, 1, 1, 1, 0, 0, 1, 1, 1, 0, 0, 1, 1, 1, 0, 0, 1, 1, 1, 0, 0, 0]
 NOAA_PEAKHEIGHTWIGGLE = 0.25 # %allowable change in peak height
 NOAA_MINPEAKDIST = 0.45 # min distance between two sync in seconds
 NOAA_COLORCORRECT_FIFOLEN = 10000
+NOAA_WEDGELINES = 8 # lines of a telemetry wedge
+NOAA_FRAMELINES = 128 # lines of a telemetry frame of 16 wedges
+NOAA_WEDGEMARGIN = 2 # lines at either edge of a wedge left out of its level
+NOAA_WEDGEMINCORRELATION = 0.9 # correlation of the telemetry with wedges 1 to 9 needed to find a frame
+NOAA_LINEBATCH = 256 # image lines extracted together
+NOAA_LINETIMINGORDER = 2 # degree of the polynomial of the time of a sync against its line number
+NOAA_LINETIMINGTOLERANCE = 2 # words by which a sync may differ from the line timing, the others are outliers
+NOAA_LINETIMINGITERATIONS = 5 # fits of the line timing, each with the syncs close to the previous one
+NOAA_SYNCBATCH = 16 # accurate sync search windows processed together
+NOAA_SYNCWORKERS = 1 # default number of threads of the accurate sync search
+NOAA_STREAMCHUNK = 1048576 # source samples read at a time when the image is decoded line by line
+NOAA_STREAMPOLL = 1 # seconds between reads of a source that is still being written
+NOAA_STREAMTIMEOUT = 10 # seconds a followed source may not grow before the line stream ends
+NOAA_COLORPALETTE = "default" # palette of false color images
+# false color palettes: temperature limit of clouds, visible limits of sea and land, and [min, max] HSV colors of clouds, sea and ground
+NOAA_COLORPALETTES = {
+    "default": {"tempLimit": 155.0, "seaLimit": 30.0, "landLimit": 90.0, "clouds": [[230/360.0, 0.2, 0.3], [230/360.0, 0.0, 1.0]], "sea": [[200/360.0, 0.7, 0.6], [240/360.0, 0.6, 0.4]], "ground": [[60/360.0, 0.6, 0.2], [100/360.0, 0.0, 0.5]]},
+    "warm": {"tempLimit": 147.0, "seaLimit": 25.0, "landLimit": 90.0, "clouds": [[230/360.0, 0.2, 0.3], [230/360.0, 0.0, 1.0]], "sea": [[200/360.0, 0.7, 0.6], [240/360.0, 0.6, 0.4]], "ground": [[60/360.0, 0.6, 0.2], [100/360.0, 0.0, 0.5]]},
+    "vivid": {"tempLimit": 155.0, "seaLimit": 30.0, "landLimit": 90.0, "clouds": [[220/360.0, 0.1, 0.4], [220/360.0, 0.0, 1.0]], "sea": [[195/360.0, 0.9, 0.7], [235/360.0, 0.8, 0.35]], "ground": [[45/360.0, 0.8, 0.3], [110/360.0, 0.5, 0.6]]},
+}
 NOAA_DETECTMAXCHANGE = 5
 NOAA_DETECTCONSSYNCSNUM = 10
 NOAA_SATS = {137620000:"NOAA 15", 137100000:"NOAA 19", 137912500:"NOAA 18"}
 
+## AM demodulation settings
+AM_APT_CARRIER = 2400 # subcarrier frequency of APT
+AM_APT_PASSBAND = 2080 # bandwidth of the APT envelope, half the word rate
+AM_APT_ATTENUATION = 60 # attenuation in dB of the APT product detector low pass
+
+## Filter settings
+FLT_OVERLAPSAVE_MINTAPS = 32 # FIR filters with these many taps or more are applied by FFT convolution
+FLT_OVERLAPSAVE_MAXFFT = 2**16
+FLT_OVERLAPSAVE_BATCH = 2**20 # number of samples transformed together
+FLT_XLATING_TAPSPERPHASE = 8 # default low pass length of frequency translating decimators, per decimation phase
+FLT_CHAIN_ATTENUATION = 60 # default stop band attenuation in dB of decimation chains
+FLT_CHAIN_MAXSTAGES = 3 # maximum number of stages of a decimation chain
+FLT_CHAIN_STAGECOST = 1.0 # overhead of an extra stage, in multiplies per input sample
+FLT_CHAIN_CICMAXORDER = 5 # highest order of moving sum (CIC) first stages
+FLT_SPEC_RIPPLE = 0.1 # default pass band ripple in dB of specification designed FIR filters
+FLT_SPEC_ATTENUATION = 60 # default stop band attenuation in dB of specification designed FIR filters
+FLT_SPEC_MAXTAPS = 16385 # longest specification designed FIR filter
+FLT_SPEC_MAXOPTTAPS = 1025 # longest remez or least squares design tried, they are much slower to design than Kaiser windows
+FLT_RESAMPLER_MAXUP = 131072 # largest interpolation of rational resamplers, other ratios are approximated
+FLT_INTFRONTEND_ORDER = 3 # default number of moving sums of integer front ends
+FLT_INTFRONTEND_NCOBITS = 8 # NCO table entries of integer front ends, products of 8 bit samples and 8 bit entries fit in int16
+FLT_INTFRONTEND_NCOSIZE = 65536 # longest NCO table period, other offsets are rounded
+FLT_ZEROPHASE_BLOCKSIZE = 65536 # samples emitted per backward pass of streaming zero phase filters
+FLT_ZEROPHASE_TOLERANCE = 1e-9 # the backward pass settles until the impulse response falls below this (relative)
+FLT_ZEROPHASE_MAXMARGIN = 2**20 # longest settle margin of streaming zero phase filters
+FLT_DESIGNCACHE_SIZE = 64 # number of filter designs kept in memory
+FLT_DESIGNCACHE_DIR = None # directory to keep filter designs in between runs, disabled if None
+
 
 ###### Do not change these
 
@@ -36,5 +104,5 @@ FLT_BP = 2
 FLT_BS = 3
 
 ## Chunker var names
-CHUNK_FREQOFFSET = "freqoffset"
+CHUNK_FREQOFFSET = "freqoffset" # phase of the frequency offset at the start of the next chunk, in cycles
 CHUNK_BWLIM = "bwlim"
\ No newline at end of file
@@ -39,6 +39,18 @@ class decode_afsk1200:
         self.__msg = None
         self.__graphs = 0
         self.__useful = 0
+        self.__spilled = False
+
+    @property
+    def spilled(self):
+
+        '''See if the accumulated signal had to be moved to a disk backed store
+
+        Returns:
+            :obj:`bool`: True if the signal was spilled to disk
+        '''
+
+        return self.__spilled
 
     @property
     def useful(self):
@@ -67,7 +79,7 @@ class decode_afsk1200:
             sig = comm.commSignal(self.__sigsrc.sampFreq)
 
             chunkerObj = chunker.chunker(self.__sigsrc)
-            bhFilter = filters.blackmanHarris(151)
+            xlatingFilter = filters.xlatingDecimator(self.__sigsrc.sampFreq, self.__offset, int(self.__sigsrc.sampFreq / self.__bw), b = signal.blackmanharris(151))
             fmDemodObj = demod_fm.demod_fm()
             
 
@@ -76,20 +88,16 @@ class decode_afsk1200:
                 logging.info('Processing chunk %d of %d chunks', chunkerObj.getChunks.index(i)+1, len(chunkerObj.getChunks))
 
                 # get the signal
-                chunkSig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i), chunkerObj)
-
-                ## Offset the frequency if required, not needed here
-                chunkSig.offsetFreq(self.__offset)
+                chunkSig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i, out = chunkerObj.workspace.get("read", i[1] - i[0], np.complex64)), chunkerObj)
 
-                ## Apply a blackman harris filter to get rid of noise
-                chunkSig.filter(bhFilter)
-
-                ## Limit bandwidth
-                chunkSig.bwLim(self.__bw)
+                ## Offset the frequency, apply a blackman harris filter to get rid of noise and limit bandwidth, in one pass
+                chunkSig.decimate(xlatingFilter)
 
                 # store signal
                 sig.extend(chunkSig)
 
+            self.__spilled = sig.spilled
+
             ## FM demodulate
             sig.funcApply(fmDemodObj.demod)
             logging.info('FM demod complete')
@@ -3,6 +3,7 @@ fm specific
 '''
 from directdemod import source, sink, chunker, comm, constants, filters, demod_am, demod_fm
 import numpy as np
+import scipy.signal as signal
 import matplotlib.pyplot as plt
 import scipy.io.wavfile as wavf
 import time
@@ -52,19 +53,18 @@ class decode_fm:
         #print(audioFreq, self.__bw)
 
         audioOut = comm.commSignal(audioFreq)
-        bhFilter = filters.blackmanHarris(151)
+        xlatingFilter = filters.xlatingDecimator(self.__sigsrc.sampFreq, self.__offset, int(self.__sigsrc.sampFreq / self.__bw), b = signal.blackmanharris(151))
         fmDemdulator = demod_fm.demod_fm()
-        chunkerObj = chunker.chunker(sigsrc)
+        chunkerObj = chunker.chunker(self.__sigsrc)
         #print(chunkerObj.getChunks)
         #print(len(chunkerObj.getChunks[:10]))
 
         for i in chunkerObj.getChunks:
             offset = self.__offset
 
-            sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i), chunkerObj)\
-                .offsetFreq(self.__offset).filter(bhFilter)\
-                .bwLim(self.__bw, uniq="First")\
-                .funcApply(fmDemdulator.demod)\
+            sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i, out = chunkerObj.workspace.get("read", i[1] - i[0], np.complex64)), chunkerObj)\
+                .decimate(xlatingFilter)\
+                .funcApply(lambda x: fmDemdulator.demod(x, out = chunkerObj.workspace.get("demod", len(x), x.real.dtype)))\
                 .bwLim(audioFreq, strictness)
 
             audioOut.extend(sig)
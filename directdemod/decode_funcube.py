@@ -157,7 +157,7 @@ class decode_funcube:
         chunkerObj = chunker.chunker(self.__sigsrc)
 
         # butter filter
-        bf = filters.butter(self.__sigsrc.sampFreq, self.__bw)
+        bf = filters.butterSos(self.__sigsrc.sampFreq, self.__bw)
 
         # init vars for gardner
         symbolPeriod = self.__sigsrc.sampFreq/12000
@@ -196,7 +196,7 @@ class decode_funcube:
 
         for i in chunkerObj.getChunks[:]:
             #interpolate
-            sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i))
+            sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i, out = chunkerObj.workspace.get("read", i[1] - i[0], np.complex64)), chunkerObj)
             
             doppCorrect_freqs = self.__offset
             if self.__corrfreq:
@@ -154,7 +154,7 @@ class decode_meteorm2:
         chunkerObj = chunker.chunker(self.__sigsrc)
 
         # butter filter
-        bf = filters.butter(self.__sigsrc.sampFreq, self.__bw)
+        bf = filters.butterSos(self.__sigsrc.sampFreq, self.__bw)
 
         # init vars for gardner
         symbolPeriod = self.__sigsrc.sampFreq/72000
@@ -221,7 +221,7 @@ class decode_meteorm2:
         for i in chunkerObj.getChunks[:]:
 
             #interpolate
-            sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i))
+            sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i, out = chunkerObj.workspace.get("read", i[1] - i[0], np.complex64)), chunkerObj)
             sig.offsetFreq(self.__offset)
             sig.filter(bf)
 
@@ -1,9 +1,9 @@
 '''
 noaa specific
 '''
-from directdemod import source, sink, chunker, comm, constants, filters, demod_am, demod_fm
+from directdemod import source, sink, chunker, comm, constants, filters, demod_am, demod_fm, workspace
 import numpy as np
-import logging, colorsys
+import logging, time, collections, concurrent.futures
 import scipy.signal as signal
 from scipy import stats
 import scipy.ndimage
@@ -13,6 +13,9 @@ from scipy import ndimage
 from scipy import misc
 from PIL import Image
 
+# false color tables of the palettes, keyed by their settings, shared by all decoders of the process
+_colorTables = {}
+
 '''
 Object to decode NOAA APT
 '''
@@ -23,7 +26,7 @@ class decode_noaa:
     Object to decode NOAA APT
     '''
 
-    def __init__(self, sigsrc, offset, bw = None):
+    def __init__(self, sigsrc, offset, bw = None, intFrontEnd = False):
 
         '''Initialize the object
 
@@ -31,28 +34,42 @@ class decode_noaa:
             sigsrc (:obj:`commSignal`): IQ data source
             offset (:obj:`float`): Frequency offset of source in Hz
             bw (:obj:`int`, optional): Bandwidth
+            intFrontEnd (:obj:`bool`, optional): mix and decimate the raw 8 bit samples with integer arithmetic first, the source must provide readRaw
         '''
+        self.__intFrontEnd = intFrontEnd
         self.__bw = bw
         if self.__bw is None:
             self.__bw = constants.NOAA_FMBW
         self.__sigsrc = sigsrc
         self.__offset = offset
-        self.__extractedAudio = None
         self.__image = None
         self.__syncA = None
         self.__syncB = None
         self.__asyncA = None
         self.__asyncB = None
-        self.__audOut = None
+        self.__products = {}
         self.__asyncApk = None
         self.__asyncAtime = None
         self.__asyncBpk = None
         self.__asyncBtime = None
         self.__useNormCorrelate = None
-        self.__color = None
+        self.__color = {}
         self.__useful = 0
         self.__chIDA = None
         self.__chIDB = None
+        self.__spilled = False
+        self.__workspace = workspace.workspace()
+
+    @property
+    def spilled(self):
+
+        '''See if any intermediate signal had to be moved to a disk backed store
+
+        Returns:
+            :obj:`bool`: True if some signal was spilled to disk
+        '''
+
+        return self.__spilled
 
     @property
     def channelID(self):
@@ -90,10 +107,7 @@ class decode_noaa:
             :obj:`commSignal`: An audio signal
         '''
 
-        if self.__extractedAudio is None:
-            self.__extractedAudio = self.__audio()
-
-        return self.__extractedAudio
+        return self.__audio()
 
     def getMapImage(self, cTime, destFileRot, destFileNoRot, satellite, tleFile = None):
 
@@ -262,250 +276,343 @@ class decode_noaa:
         '''
 
         if self.__image is None:
-            if self.__audOut is None or self.__syncA is None or self.__syncB is None:
+            if self.__syncA is None or self.__syncB is None:
                 self.getCrudeSync()
 
             logging.info('Beginning image extraction')
             
-            # get audio
-            amSig = self.__audOut
+            # APT envelope of the band passed audio
+            amSig = self.__product(("apt", constants.NOAA_IMAGEOVERSAMPLE, constants.AM_APT_PASSBAND, True), lambda: self.__getAPT(self.__bandPassed(), constants.NOAA_IMAGEOVERSAMPLE, constants.AM_APT_PASSBAND))
 
-            # apply a bandpass filter to remove any noise
-            amSig.filter(filters.butter(amSig.sampRate, 400, 4400, typeFlt = constants.FLT_BP, zeroPhase = True))
+            # every line is channel A from its sync A to sync B, then channel B upto the next sync A, all placed by the line timing
+            startA, startB, endB, detected = self.__lineTiming(self.__syncA * amSig.sampRate / self.__syncCrudeSampRate, self.__syncB * amSig.sampRate / self.__syncCrudeSampRate, amSig.length, amSig.sampRate)
 
-            # am demodulate
-            amSig = self.__getAM(amSig)
+            numPixels = int(0.5/constants.NOAA_T)
+            lines = np.arange(len(startA))
+
+            # pixel values of all lines at once, the samples of the sync A pixels are kept for color correction
+            oversample = max(1, int(round(amSig.sampRate * constants.NOAA_T)))
+            syncPixels = len(constants.NOAA_SYNCA)
+            pixels = np.empty((len(lines), numPixels))
+            syncSamples = np.empty((len(lines), syncPixels, oversample))
+            for i in range(0, len(lines), constants.NOAA_LINEBATCH):
+                batch = lines[i:i + constants.NOAA_LINEBATCH]
+                samplesA = self.__extractLines(amSig.signal, startA[batch], startB[batch], numPixels // 2, oversample)
+                syncSamples[i:i + len(batch)] = samplesA[:, :syncPixels]
+                pixels[i:i + len(batch), :numPixels // 2] = np.median(samplesA, axis = -1)
+                pixels[i:i + len(batch), numPixels // 2:] = np.median(self.__extractLines(amSig.signal, startB[batch], endB[batch], numPixels // 2, oversample), axis = -1)
+
+            # calibration is a second pass over the raw pixel values of all lines
+            gain, offset = self.__calibration(pixels, syncSamples, detected)
+
+            pixels *= gain[:, None]
+            pixels += offset[:, None]
+            np.round(pixels, out = pixels)
+            np.clip(pixels, 0, 255, out = pixels)
+            self.__image = np.empty(pixels.shape, dtype = np.uint8)
+            self.__image[:] = pixels
 
-            # convert sync from samples to time
-            csyncA = self.__syncA / self.__syncCrudeSampRate
-            csyncB = self.__syncB / self.__syncCrudeSampRate
+            logging.info('Image extraction complete')
 
-            # convert back to sample number
-            csyncA *= amSig.sampRate
-            csyncB *= amSig.sampRate
+        return self.__image
 
-            # store uncorrected csync
-            ucsync = csyncA[:]
+    def __calibration(self, pixels, syncSamples, detected):
 
-            # correct any missing syncs
-            csyncA = self.__fillSync(csyncA, amSig.length)
-            csyncB = self.__fillSync(csyncB, amSig.length)
+        '''Find the mapping of raw pixel values to 0 to 255, from the telemetry wedges or else from the sync levels
 
-            # we want channel A first always
-            if csyncB[0] < csyncA[0]:
-                csyncB.pop(0)
+        Telemetry frames are found by correlating the telemetry of every line with wedges 1 to 9, the
+        calibration is fitted once to the wedges of all frames found. The channel IDs are read from
+        wedge 16 of the frames
 
-            if csyncB[-1] < csyncA[-1]:
-                csyncA.pop(-1)
+        Args:
+            pixels (:obj:`numpy array`): raw pixel values of shape (lines, 2080)
+            syncSamples (:obj:`numpy array`): samples of the sync A pixels of every line, of shape (lines, 40, oversample)
+            detected (:obj:`numpy array`): whether the sync A of every line was detected
 
-            if not len(csyncA) == len(csyncB):
-                logging.error("Number of syncA and syncB unequal")
-                csyncB = np.array(csyncA) +  int(0.25 * amSig.sampRate)
+        Returns:
+            :obj:`tuple`: gain and offset of every line
+        '''
 
-            self.__image = []
-            imageBuffer = []
-            backupImage = []
+        numLines = len(pixels)
+        half = pixels.shape[1] // 2
+        wedgeWidth = len(constants.NOAA_SYNCA)
+
+        # sync levels of the lines with a detected sync, smoothed over about as many lines as give NOAA_COLORCORRECT_FIFOLEN samples
+        lowBits = np.array(constants.NOAA_SYNCA) == 0
+        if np.any(detected):
+            found = np.flatnonzero(detected)
+            span = max(1, constants.NOAA_COLORCORRECT_FIFOLEN // syncSamples[0, ~lowBits].size)
+            val11 = ndimage.median_filter(np.median(syncSamples[found][:, lowBits].reshape(len(found), -1), axis = -1), span, mode = 'nearest')
+            val244 = ndimage.median_filter(np.median(syncSamples[found][:, ~lowBits].reshape(len(found), -1), axis = -1), span, mode = 'nearest')
+            val11, val244 = np.interp(np.arange(numLines), found, val11), np.interp(np.arange(numLines), found, val244)
+            low = val11 - (val244 - val11)*(11 - 0)/(244 - 11)
+            high = val11 - (val244 - val11)*(11 - 255)/(244 - 11)
+        else:
+            low, high = np.percentile(pixels, (0.5, 99.5))
+        gain = np.broadcast_to(255 / (high - low), numLines)
+        offset = np.broadcast_to(-255 * low / (high - low), numLines)
+
+        # telemetry of every line, wedges 1 to 9 are the same in both channels
+        telemetryA = np.median(pixels[:, half - wedgeWidth:half], axis = -1)
+        telemetryB = np.median(pixels[:, -wedgeWidth:], axis = -1)
+        telemetry = (telemetryA + telemetryB) / 2
+
+        # wedges 1 to 8 step up to white, wedge 9 is black
+        wedgeLines = constants.NOAA_WEDGELINES
+        levels = np.append(np.arange(1, 9), 0) * 255.0/8
+        template = np.repeat(levels, wedgeLines) - np.mean(levels)
+
+        frames = np.zeros(0, dtype = int)
+        if numLines >= len(template):
+            windows = np.lib.stride_tricks.as_strided(telemetry, shape = (numLines - len(template) + 1, len(template)), strides = (telemetry.strides[0], telemetry.strides[0]))
+            windows = windows - np.mean(windows, axis = -1, keepdims = True)
+            cor = (windows @ template) / ((np.sum(windows * windows, axis = -1) * np.sum(template * template))**0.5 + 1e-30)
+            best = cor == ndimage.maximum_filter1d(cor, constants.NOAA_FRAMELINES, mode = 'constant')
+            frames = np.flatnonzero(best & (cor >= constants.NOAA_WEDGEMINCORRELATION))
+
+        if len(frames) == 0:
+            logging.info('No telemetry frame found, calibration by the sync levels')
+            return gain, offset
+
+        # the level of a wedge is taken away from the lines at its edges
+        inner = np.arange(constants.NOAA_WEDGEMARGIN, wedgeLines - constants.NOAA_WEDGEMARGIN)
+        wedges = np.median(telemetry[frames[:, None, None] + wedgeLines * np.arange(len(levels))[:, None] + inner], axis = -1)
+        slope, intercept, r_value, p_value, std_err = stats.linregress(wedges.ravel(), np.tile(levels, len(frames)))
+        logging.info('Telemetry calibration from %d frames, slope: %f intercept: %f', len(frames), slope, intercept)
+
+        # wedge 16 of the frames found, and of the frames before them
+        chid = np.concatenate([frames + constants.NOAA_FRAMELINES - wedgeLines, frames - wedgeLines])
+        chid = chid[(chid >= 0) & (chid + wedgeLines <= numLines)]
+        if len(chid) > 0:
+            index = chid[:, None] + inner
+            self.__chIDA = int(np.round((slope*np.median(telemetryA[index]) + intercept) / (255.0/8)))
+            self.__chIDB = int(np.round((slope*np.median(telemetryB[index]) + intercept) / (255.0/8)))
+
+        return np.full(numLines, slope), np.full(numLines, intercept)
+
+    def __extractLines(self, sig, starts, ends, numPixels, oversample):
+
+        '''Samples of every pixel of a batch of lines, by cubic interpolation of the signal at fractional positions
 
-            numPixels = int(0.5/constants.NOAA_T)
-            imgLine = amSig.signal[:int(len(amSig.signal)/numPixels) * numPixels]
-            imgLine = np.reshape(imgLine, (numPixels, int(len(imgLine)/numPixels)))
-            imgLine = np.median(imgLine, axis = -1)
-            (self.__low, self.__high) = np.percentile(imgLine, (0.5, 99.5))
-
-            # vars for image correction
-            lowFifo, highFifo = [], []
-            corrfifo = []
-            corrfifosig = []
-            corrfifosig2 = []
-            ncorrfifo = 3
-            lcorr = None
-            lcorrsig = None
-            statecorr = 0
-            valuesPixCorr = []
-            valuesSigCorr = []
-            self.__slope = None
-            self.__intercept = None
-            chidFifo1 = []
-            chidFifo2 = []
-
-            for syncIndex in range(len(csyncA)):
-
-                logging.info('Decoding line %d of %d lines', syncIndex + 1, len(csyncA))
-
-                startIA = int(csyncA[syncIndex])
-                startIB = int(csyncB[syncIndex])
-
-                endIA = startIB
-                endIB = startIB + int(0.25 * amSig.sampRate)
-                if 1+syncIndex < len(csyncA):
-                    endIB = int(csyncA[syncIndex + 1])
-                    
-                if endIB > amSig.length or endIA > amSig.length or startIA < 0 or startIB < 0:
-                    continue
-
-                imgLineA = amSig.signal[startIA:endIA]
-                imgLineB = amSig.signal[startIB:endIB]
-
-
-                imgLineA = signal.resample(imgLineA, int(int(len(imgLineA)/(numPixels*0.5)) * (numPixels*0.5)))
-                imgLineB = signal.resample(imgLineB, int(int(len(imgLineB)/(numPixels*0.5)) * (numPixels*0.5)))
-
-                imgLineA = np.reshape(imgLineA, (int(numPixels*0.5), int(len(imgLineA)/(numPixels*0.5))))
-                imgLineB = np.reshape(imgLineB, (int(numPixels*0.5), int(len(imgLineB)/(numPixels*0.5))))
-
-                # image color correction based on sync
-                if csyncA[syncIndex] in ucsync:
-                    for j in range(len(constants.NOAA_SYNCA)):
-                        if constants.NOAA_SYNCA[j] == 0:
-                            lowFifo.extend(imgLineA[j])
-                        else:
-                            highFifo.extend(imgLineA[j])
-                        lowFifo = lowFifo[-1*constants.NOAA_COLORCORRECT_FIFOLEN:]
-                        highFifo = highFifo[-1*constants.NOAA_COLORCORRECT_FIFOLEN:]
-                    val11, val244 = np.median(lowFifo), np.median(highFifo)
-                    val0 = val11 - (val244 - val11)*(11 - 0)/(244 - 11)
-                    val255 = val11 - (val244 - val11)*(11 - 255)/(244 - 11)
-                    self.__low = val0
-                    self.__high = val255
-
-                # image color correction based on calibration strip
-                lengthOfStrip = int((len(constants.NOAA_SYNCA) * constants.NOAA_T) * amSig.sampRate)
-                stripVal = np.median(amSig.signal[startIA - lengthOfStrip:startIA])
-
-                corrfifo.append(255 * (stripVal - self.__low) / (self.__high - self.__low))
-                corrfifo = corrfifo[-1*ncorrfifo:]
-                outcorr = np.median(corrfifo)
-                
-                corrfifosig.append(stripVal)
-                corrfifosig = corrfifosig[-1*ncorrfifo:]
-                outcorrsig = np.median(corrfifosig)
-
-                lengthOfStrip2 = int((len(constants.NOAA_SYNCB) * constants.NOAA_T) * amSig.sampRate)
-                stripVal2 = np.median(amSig.signal[startIB - lengthOfStrip2:startIB])
-
-                corrfifosig2.append(stripVal2)
-                corrfifosig2 = corrfifosig2[-1*ncorrfifo:]
-                outcorrsig2 = np.median(corrfifosig2)
-
-                chidFifo1.append(outcorrsig2)
-                chidFifo1 = chidFifo1[-100:]
-
-                chidFifo2.append(outcorrsig)
-                chidFifo2 = chidFifo2[-100:]
-
-                if lcorr is None or abs(outcorr - lcorr) > 255.0/16:
-                    logging.info('Color correction state: %d', statecorr)
-                    if statecorr == 0 and not lcorrsig is None:
-                        valuesPixCorr = [lcorr, outcorr]
-                        valuesSigCorr = [lcorrsig, outcorrsig]
-                        statecorr = 1
-                    elif 1 <= statecorr <= 6:
-                        if outcorr - valuesPixCorr[-1] > 2*255.0/(8*3):
-                            valuesPixCorr.append(outcorr)
-                            valuesSigCorr.append(outcorrsig)
-                            statecorr += 1
-                        else:
-                            statecorr = 0
-                    elif statecorr == 7:
-                        if valuesPixCorr[-1] - outcorr > 2*255.0/3:
-                            valuesPixCorr = [outcorr] + valuesPixCorr
-                            valuesSigCorr = [outcorrsig] + valuesSigCorr
-                            self.__slope, self.__intercept, r_value, p_value, std_err = stats.linregress(valuesSigCorr,np.array([i for i in range(9)]) * 255.0/8)
-                            logging.info('Color correction bingo slope: %f intercept: %f', self.__slope, self.__intercept)
-                            if len(chidFifo1) > 1+64+8:
-                                    self.__chIDA = int(np.round((self.__slope*np.median(chidFifo1[-1-64-8:-1-64]) + self.__intercept) / (255.0/8)))
-                                    self.__chIDB = int(np.round((self.__slope*np.median(chidFifo2[-1-64-8:-1-64]) + self.__intercept) / (255.0/8)))
-
-                            chidFifo1 = []
-                            chidFifo2 = []
-                            statecorr = 0
-                        else:
-                            statecorr = 0
-                lcorr = outcorr
-                lcorrsig = outcorrsig
-
-
-                imgLineA = np.median(imgLineA, axis = -1)
-                imgLineB = np.median(imgLineB, axis = -1)
-                imgLine = np.concatenate([imgLineA, imgLineB])
-
-                if self.__slope is None or self.__intercept is None:
-                    imageBuffer.append(imgLine[:])
-                    imgLine = np.round(255 * (imgLine - self.__low) / (self.__high - self.__low))
-                    imgLine[imgLine < 0] = 0
-                    imgLine[imgLine > 255] = 255
-                    imgLine = imgLine.astype(np.uint8)
-                    backupImage.append(imgLine)
+        Args:
+            sig (:obj:`numpy array`): APT envelope
+            starts (:obj:`numpy array`): first sample of every line, need not be whole
+            ends (:obj:`numpy array`): sample after the last one of every line
+            numPixels (:obj:`int`): pixels per line
+            oversample (:obj:`int`): samples taken per pixel
+
+        Returns:
+            :obj:`numpy array`: samples of shape (lines, numPixels, oversample)
+        '''
+
+        # the line is spread evenly over numPixels * oversample points, as resampling it would
+        grid = np.arange(numPixels * oversample) / (numPixels * oversample)
+        position = starts[:, None] + (ends - starts)[:, None] * grid
+        np.clip(position, 0, len(sig) - 1, out = position)
+        index = np.clip(position.astype(int), 1, len(sig) - 3)
+        f = position - index
+
+        # third order Lagrange interpolator in Farrow form, the weights are polynomials of the fraction
+        samples = sig[index - 1] * (-f * (f - 1) * (f - 2) / 6)
+        samples += sig[index] * ((f + 1) * (f - 1) * (f - 2) / 2)
+        samples += sig[index + 1] * (-(f + 1) * f * (f - 2) / 2)
+        samples += sig[index + 2] * ((f + 1) * f * (f - 1) / 6)
+
+        return samples.reshape(len(starts), numPixels, oversample)
+
+    def __lineTiming(self, syncA, syncB, length, sampRate):
+
+        '''Fit the time of the syncs against the line number, with outliers rejected, and place every line by it
+
+        The time of a sync is a polynomial of degree constants.NOAA_LINETIMINGORDER of its line number, the
+        line period and its drift. Sync B is half a line after sync A, so both are fitted together.
+        Syncs further than constants.NOAA_LINETIMINGTOLERANCE words from the fit are left out of it
+
+        Args:
+            syncA (:obj:`numpy array`): detected syncs A in samples
+            syncB (:obj:`numpy array`): detected syncs B in samples
+            length (:obj:`int`): length of the signal
+            sampRate (:obj:`int`): sampling frequency in Hz
+
+        Returns:
+            :obj:`tuple`: start of channel A, start of channel B and end of every line that fits in the signal, in fractional samples, and whether its sync A was detected
+        '''
+
+        nominal = 0.5 * sampRate
+        tolerance = constants.NOAA_LINETIMINGTOLERANCE * sampRate * constants.NOAA_T
+        syncA, syncB = np.sort(syncA).astype(float), np.sort(syncB).astype(float)
+
+        # syncs a line apart from another are surely syncs, they are numbered from line to line to start the fit
+        spacing = np.abs(np.diff(syncA) - nominal) < tolerance
+        sure = np.concatenate([spacing, [False]]) | np.concatenate([[False], spacing])
+        if np.sum(spacing) > 0:
+            period = np.median(np.diff(syncA)[spacing])
+            fitLines = np.concatenate([[0], np.cumsum(np.round(np.diff(syncA[sure]) / period))])
+            fitSyncs = syncA[sure]
+        else:
+            period = nominal
+            fitLines, fitSyncs = np.zeros(1), np.concatenate([syncA, [0]])[:1]
+
+        # all syncs are numbered by the fit and the fit is repeated with the ones close to it
+        syncs = np.concatenate([syncA, syncB])
+        shift = np.concatenate([np.zeros(len(syncA)), np.full(len(syncB), 0.5)])
+        keep = None
+        for i in range(constants.NOAA_LINETIMINGITERATIONS):
+            coef = np.polyfit(fitLines, fitSyncs, min(constants.NOAA_LINETIMINGORDER, len(np.unique(fitLines)) - 1))
+            if len(coef) == 1:
+                coef = np.array([period, coef[0]])
+            grid = np.arange(np.floor((-fitSyncs[0]) / period) + fitLines[0] - 2, np.ceil((length - fitSyncs[0]) / period) + fitLines[0] + 3)
+            timing = np.polyval(coef, grid)
+            lineOf = np.round(np.interp(syncs, timing, grid) - shift) + shift
+            residual = syncs - np.polyval(coef, lineOf)
+            newKeep = np.abs(residual) <= tolerance
+            if np.sum(newKeep) == 0 or (not keep is None and np.array_equal(keep, newKeep)):
+                break
+            keep = newKeep
+            fitLines, fitSyncs = lineOf[keep], syncs[keep]
+
+        # the lines that fit in the signal, the grid holds whole line numbers
+        lines = grid[:-1][(timing[:-1] >= 0) & (timing[1:] <= length)]
+        detected = np.zeros(len(lines), dtype = bool)
+        if not keep is None:
+            detected = np.isin(lines, lineOf[keep & (shift == 0)])
+
+        return np.polyval(coef, lines), np.polyval(coef, lines + 0.5), np.polyval(coef, lines + 1), detected
+
+    def getLines(self, follow = False):
+
+        '''Decode the image line by line while the source is read, memory use does not grow with the pass
+
+        Syncs A are tracked in a short rolling window of the APT envelope, as getCrudeSync does, and every
+        line is mapped to pixel values by the levels of the recent syncs. Lines of missed syncs are
+        placed where the syncs were predicted. With follow, a source that is still being written is read
+        again (it must provide refresh) until it has not grown for constants.NOAA_STREAMTIMEOUT seconds
+
+        Args:
+            follow (:obj:`bool`, optional): keep reading a growing source
+
+        Returns:
+            :obj:`generator`: lines of the image, numpy arrays of 2080 uint8 pixels
+        '''
+
+        frontEnd, xlatingFilter = self.__channel()
+        fmRate = int(int(self.__sigsrc.sampFreq if frontEnd is None else frontEnd.sampRate) / xlatingFilter.decimation)
+        bandPass = filters.butterSos(fmRate, 400, 4400, typeFlt = constants.FLT_BP)
+        aptDemodulator = demod_am.demod_apt(fmRate, constants.NOAA_IMAGEOVERSAMPLE, constants.AM_APT_PASSBAND)
+
+        rate = aptDemodulator.sampRate
+        needle = self.__syncNeedle(rate, constants.NOAA_SYNCA)
+        engine = filters.correlator([needle])
+        acquire = int(constants.NOAA_TRACKACQUIRE * rate)
+        width = constants.NOAA_TRACKWIDTH
+
+        numPixels = int(0.5/constants.NOAA_T)
+        oversample = max(1, int(round(rate * constants.NOAA_T)))
+        syncPixels = len(constants.NOAA_SYNCA)
+        lowBits = np.array(constants.NOAA_SYNCA) == 0
+        lowFifo = collections.deque(maxlen = constants.NOAA_COLORCORRECT_FIFOLEN)
+        highFifo = collections.deque(maxlen = constants.NOAA_COLORCORRECT_FIFOLEN)
+
+        # the envelope not decoded yet, syncs are located in it
+        buffer = np.zeros(0)
+        lock = None
+
+        for envelope in self.__streamEnvelope(frontEnd, xlatingFilter, bandPass, aptDemodulator, follow):
+            buffer = np.concatenate([buffer, envelope])
+
+            while True:
+                if lock is None:
+                    # acquisition by a full search, the end of the window is searched again with the next one
+                    if len(buffer) < acquire:
+                        break
+                    found = self.__acquireLock(buffer[:acquire], rate, needle, engine)
+                    if found is None:
+                        buffer = buffer[acquire - len(needle):]
+                        continue
+                    locked, period, threshold = found
+                    lock = [locked[0], period, threshold, 0]
+                    logging.info('Line stream locked')
+
+                last, period, threshold, misses = lock
+                detected = misses == 0
+                expected = int(round(last + period))
+                first = expected - width
+                if expected + width + len(needle) > len(buffer):
+                    break
+
+                # the sync is taken where it was predicted if it is not found
+                height = self.__windowHeights(buffer[first:expected + width + len(needle)], needle)
+                if np.max(height) >= threshold:
+                    peak = first + np.argmax(height)
+                    period += constants.NOAA_TRACKGAIN * ((peak - last) - period)
+                    misses = 0
                 else:
-                    if len(imageBuffer) > 0:
-                        for i in imageBuffer:
-                            imgLineb = np.round(i*self.__slope + self.__intercept)
-                            imgLineb[imgLineb < 0] = 0
-                            imgLineb[imgLineb > 255] = 255
-                            imgLineb = imgLineb.astype(np.uint8)
-                            self.__image.append(imgLineb)
-                        imageBuffer = []
-                    imgLine = np.round(imgLine*self.__slope + self.__intercept)
-                    imgLine[imgLine < 0] = 0
-                    imgLine[imgLine > 255] = 255
-                    imgLine = imgLine.astype(np.uint8)
-                    self.__image.append(imgLine)
-
-            # use backup if color correction didnot work
-            if len(self.__image) == 0:
-                self.__image = backupImage
-
-            # get mean lengths of lines
-            lens = [len(i) for i in self.__image]
-            acceptedLen = max(set(lens), key=lens.count)
-            self.__image = np.array([i for i in self.__image if len(i) == acceptedLen])
+                    peak = expected
+                    misses += 1
 
-            logging.info('Image extraction complete')
+                # sync levels of the detected syncs set the mapping to pixel values
+                starts = np.array([last, last + (peak - last) / 2])
+                ends = np.array([last + (peak - last) / 2, peak])
+                samples = self.__extractLines(buffer, starts, ends, numPixels // 2, oversample)
+                if detected:
+                    lowFifo.extend(samples[0, :syncPixels][lowBits].ravel())
+                    highFifo.extend(samples[0, :syncPixels][~lowBits].ravel())
+                val11, val244 = np.median(lowFifo), np.median(highFifo)
+                low = val11 - (val244 - val11)*(11 - 0)/(244 - 11)
+                high = val11 - (val244 - val11)*(11 - 255)/(244 - 11)
 
-        return self.__image
+                line = np.median(samples, axis = -1).ravel()
+                line = np.clip(np.round(255 * (line - low) / (high - low)), 0, 255).astype(np.uint8)
+
+                # the envelope before the next line is not needed anymore
+                buffer = buffer[peak:]
+                lock = [0, period, threshold, misses]
+                if misses >= constants.NOAA_TRACKMAXMISSES:
+                    logging.info('Line stream lost lock')
+                    lock = None
+
+                yield line
+
+    def __streamEnvelope(self, frontEnd, xlatingFilter, bandPass, aptDemodulator, follow):
+
+        '''Read the source in small chunks and demodulate the APT envelope of every chunk
 
-    def __fillSync(self, csync, maxLen):
-        '''Filters and fills missed syncs to help generate image
-        
         Args:
-            csync (:obj:`list`): List of detected syncs
-            maxLen (:obj:`int`): Frequency offset of source in Hz
-        
+            frontEnd (:obj:`intFrontEnd`): integer front end, None to read complex samples
+            xlatingFilter (:obj:`decimationChain`): channel filter
+            bandPass (:obj:`sosFilter`): causal band pass of the FM demodulated signal
+            aptDemodulator (:obj:`demod_apt`): APT demodulator
+            follow (:obj:`bool`): keep reading a growing source
+
         Returns:
-            :obj:`list`: corrected syncs
-        '''
-        syncDIff = np.diff(csync)
-        modeSyncDIff = max(set(syncDIff), key=list(syncDIff).count)
-        wiggleRoom = 200
-
-        validSyncs = []
-        for i in range(len(csync) - 1):
-            if abs(csync[i+1] - csync[i] - modeSyncDIff) < wiggleRoom:
-                if csync[i] not in validSyncs:
-                    validSyncs.append(csync[i])
-                if csync[i+1] not in validSyncs:
-                    validSyncs.append(csync[i+1])
-
-        correctedSyncs = validSyncs[:]
-
-        # initial correction
-        c = validSyncs[0] - modeSyncDIff
-        while(c > wiggleRoom):
-            correctedSyncs.append(c)
-            c -= modeSyncDIff
-
-        # later corrections
-        anchor = 0
-        c = modeSyncDIff
-        while(validSyncs[anchor] + c < maxLen):
-            if (anchor + 1) < len(validSyncs) and (abs(validSyncs[anchor + 1] - c - validSyncs[anchor]) < wiggleRoom or c + validSyncs[anchor] > validSyncs[anchor + 1]):
-                anchor += 1
-                c = modeSyncDIff
-            else:
-                correctedSyncs.append(validSyncs[anchor] + c)
-                c += modeSyncDIff
+            :obj:`generator`: APT envelope of every chunk, the delay of the demodulator removed
+        '''
 
-        return list(np.sort(correctedSyncs))
+        fmDemdulator = demod_fm.demod_fm()
+
+        # the envelope lags the input by the delay of the filter
+        skip = aptDemodulator.delay
+        position = 0
+        idle = 0
+        while True:
+            if position >= self.__sigsrc.length:
+                if not follow or idle >= constants.NOAA_STREAMTIMEOUT:
+                    break
+                time.sleep(constants.NOAA_STREAMPOLL)
+                idle += constants.NOAA_STREAMPOLL
+                self.__sigsrc.refresh()
+                continue
+            idle = 0
+
+            chunk = [position, min(position + constants.NOAA_STREAMCHUNK, self.__sigsrc.length)]
+            position = chunk[1]
+            sig = self.__readChannel(frontEnd, chunk).decimate(xlatingFilter).funcApply(fmDemdulator.demod)
+            demodSig = aptDemodulator.demod(bandPass.applyOn(sig.signal))
+            drop = min(skip, len(demodSig))
+            skip -= drop
+            yield demodSig[drop:]
+
+        yield aptDemodulator.flush()[skip:]
 
     @property
     def getImageA(self):
@@ -541,61 +648,172 @@ class decode_noaa:
             :obj:`numpy array`: A matrix list of pixel
         '''
 
-        if self.__color is None:
-            if self.__image is None:
-                self.getImage
+        return self.getFalseColor(constants.NOAA_COLORPALETTE)
 
+    def getFalseColor(self, palette = constants.NOAA_COLORPALETTE):
+        '''Get false color image in a given palette (EXPERIMENTAL)
+
+        Args:
+            palette (:obj:`str`, optional): name of a palette in constants.NOAA_COLORPALETTES
+
+        Returns:
+            :obj:`numpy array`: A matrix list of pixel
+        '''
+
+        if not palette in constants.NOAA_COLORPALETTES:
+            raise ValueError("Unknown palette " + str(palette))
+
+        if not palette in self.__color:
             imageA = self.getImageA
             imageB = self.getImageB
-            #imageAb = scipy.ndimage.uniform_filter(self.getImageA, size=(3, 3))
-            #imageBb = scipy.ndimage.uniform_filter(self.getImageB, size=(3, 3))
-
-            # constants
-            #tempLimit = 147.0
-            #seaLimit = 25.0
-            #landLimit = 90.0
-
-            #orig
-            tempLimit = 155.0
-            seaLimit = 30.0
-            landLimit = 90.0
-
-            colorImg = []
-            for r in range(len(imageA)):
-                colorRow = []
-                for c in range(1040):
-                    v, t = imageA[r,c], imageB[r,c]
-                    #vb, tb = imageAb[r,c], imageBb[r,c]
-                    maxColor, minColor = None, None
-                    scaleVisible, scaleTemp = None, None
-                    # change to >
-                    if t < tempLimit:
-                        # clouds
-                        minColor, maxColor = [230/360.0, 0.2, 0.3], [230/360.0, 0.0, 1.0]
-                        scaleVisible = v / 256.0
-                        scaleTemp = (256.0 - t) / 256.0
-                    else:
-                        if v < seaLimit:
-                            # sea
-                            minColor, maxColor = [200.0/360.0, 0.7, 0.6], [240.0/360.0, 0.6, 0.4]
-                            scaleVisible = v / seaLimit
-                            scaleTemp = (256.0-t) / (256.0 - tempLimit)
-                        else:
-                            # ground
-                            minColor, maxColor = [60.0/360.0, 0.6, 0.2], [100.0/360.0, 0.0, 0.5]
-                            scaleVisible = (v - seaLimit) / (landLimit - seaLimit)
-                            scaleTemp = (256.0 - t) / (256.0 - tempLimit);
-
-                    finalS = maxColor[1] + scaleTemp * (minColor[1] - maxColor[1]);
-                    finalV = maxColor[2] + scaleVisible * (minColor[2] - maxColor[2]);
-                    finalH = maxColor[0] + scaleVisible * scaleTemp * (minColor[0] - maxColor[0]);
-                    pix = tuple([int(k * 255.0) for k in colorsys.hsv_to_rgb(finalH, finalS, finalV)])
-                    colorRow.append(pix)
-
-                colorImg.append(colorRow)
-            self.__color = np.uint8(np.array(colorImg))
-
-        return self.__color
+
+            # every (visible, temperature) pair is looked up in the table of the palette
+            settings = constants.NOAA_COLORPALETTES[palette]
+            key = repr(sorted(settings.items()))
+            if not key in _colorTables:
+                _colorTables[key] = self.__colorTable(**settings)
+            table = _colorTables[key]
+            self.__color[palette] = table[imageA, imageB]
+
+        return self.__color[palette]
+
+    def __colorTable(self, tempLimit, seaLimit, landLimit, clouds, sea, ground):
+        '''False color of every pair of visible and temperature values
+
+        Args:
+            tempLimit (:obj:`float`): temperature value below which pixels are clouds
+            seaLimit (:obj:`float`): visible value below which the other pixels are sea
+            landLimit (:obj:`float`): visible value at which ground reaches its max color
+            clouds (:obj:`list`): [min, max] HSV colors of clouds
+            sea (:obj:`list`): [min, max] HSV colors of sea
+            ground (:obj:`list`): [min, max] HSV colors of ground
+
+        Returns:
+            :obj:`numpy array`: 256 x 256 x 3 table of RGB colors, indexed by visible and temperature value
+        '''
+
+        v, t = np.meshgrid(np.arange(256.0), np.arange(256.0), indexing = 'ij')
+
+        isCloud = t < tempLimit
+        isSea = ~isCloud & (v < seaLimit)
+
+        # colors and scales of ground, then overwritten by sea and clouds
+        minColor = np.where(isSea[..., None], sea[0], ground[0])
+        maxColor = np.where(isSea[..., None], sea[1], ground[1])
+        minColor[isCloud], maxColor[isCloud] = clouds[0], clouds[1]
+
+        scaleVisible = np.where(isSea, v / seaLimit, (v - seaLimit) / (landLimit - seaLimit))
+        scaleTemp = (256.0 - t) / (256.0 - tempLimit)
+        scaleVisible[isCloud] = v[isCloud] / 256.0
+        scaleTemp[isCloud] = (256.0 - t[isCloud]) / 256.0
+
+        h = maxColor[..., 0] + scaleVisible * scaleTemp * (minColor[..., 0] - maxColor[..., 0])
+        s = maxColor[..., 1] + scaleTemp * (minColor[..., 1] - maxColor[..., 1])
+        val = maxColor[..., 2] + scaleVisible * (minColor[..., 2] - maxColor[..., 2])
+
+        # colorsys.hsv_to_rgb on arrays
+        i = np.trunc(h * 6.0)
+        f = h * 6.0 - i
+        p = val * (1.0 - s)
+        q = val * (1.0 - s * f)
+        w = val * (1.0 - s * (1.0 - f))
+        sector = i.astype(int) % 6
+        rgb = np.choose(sector[..., None], [np.stack(c, axis = -1) for c in [(val, w, p), (q, val, p), (p, val, w), (p, q, val), (w, p, val), (val, p, q)]])
+
+        return np.trunc(rgb * 255.0).astype(np.int64).astype(np.uint8)
+
+    def __product(self, key, make):
+
+        '''Get an intermediate product, it is computed only the first time it is asked for
+
+        Products are never modified once made, so that every later product can be derived from them
+
+        Args:
+            key (:obj:`tuple`): name of the product and the parameters it depends on
+            make (function): function computing the product from the cheapest upstream one
+
+        Returns:
+            :obj:`commSignal`: The product
+        '''
+
+        if not key in self.__products:
+            self.__products[key] = make()
+            self.__spilled = self.__spilled or self.__products[key].spilled
+
+        return self.__products[key]
+
+    def __fm(self):
+
+        '''Get the FM demodulated channel at the output rate of the channel filter, the only product read from the source
+
+        Returns:
+            :obj:`commSignal`: FM demodulated signal
+        '''
+
+        return self.__product(("fm",), self.__fmDemod)
+
+    def __fmDemod(self):
+
+        '''Mix, decimate and FM demodulate the source
+
+        Returns:
+            :obj:`commSignal`: FM demodulated signal at the output rate of the channel filter
+        '''
+
+        logging.info('Beginning FM demodulation in chunks')
+
+        fmOut = comm.commSignal(self.__sigsrc.sampFreq)
+        frontEnd, xlatingFilter = self.__channel()
+        fmDemdulator = demod_fm.demod_fm()
+        chunkerObj = chunker.chunker(self.__sigsrc, workspaceObj = self.__workspace)
+
+        for i in chunkerObj.getChunks:
+
+            logging.info('Processing chunk %d of %d chunks', chunkerObj.getChunks.index(i)+1, len(chunkerObj.getChunks))
+
+            # the decimated and the demodulated chunks are written to reused buffers, fmOut keeps a copy
+            sig = self.__readChannel(frontEnd, i, chunkerObj)
+            fmOut.extend(sig.decimate(xlatingFilter).funcApply(lambda x: fmDemdulator.demod(x, out = chunkerObj.workspace.get("demod", len(x), x.real.dtype))))
+
+        logging.info('FM demodulation successfully complete')
+
+        return fmOut
+
+    def __channel(self):
+
+        '''Create the filters that mix and decimate the source to the FM channel
+
+        Returns:
+            :obj:`tuple`: integer front end (None if not used) and the decimation chain after it
+        '''
+
+        decimation = int(self.__sigsrc.sampFreq / self.__bw)
+        if self.__intFrontEnd:
+            # the integer stage takes the largest share of the decimation that keeps twice the channel bandwidth
+            first = max([i for i in range(1, decimation + 1) if decimation % i == 0 and self.__sigsrc.sampFreq / i >= 2 * self.__bw])
+            frontEnd = filters.intFrontEnd(self.__sigsrc.sampFreq, self.__offset, first)
+            return frontEnd, filters.decimationChain(frontEnd.sampRate, decimation // first, constants.NOAA_FMPASSBAND)
+        return None, filters.decimationChain(self.__sigsrc.sampFreq, decimation, constants.NOAA_FMPASSBAND, offset = self.__offset)
+
+    def __readChannel(self, frontEnd, chunk, chunkerObj = None):
+
+        '''Read a chunk of the source, through the integer front end if it is used
+
+        Args:
+            frontEnd (:obj:`intFrontEnd`): integer front end, None to read complex samples
+            chunk (:obj:`list`): first and last sample of the chunk
+            chunkerObj (:obj:`chunker`, optional): chunker of the source, its workspace holds the samples read
+
+        Returns:
+            :obj:`commSignal`: samples of the chunk
+        '''
+
+        if frontEnd is None:
+            out = None
+            if not chunkerObj is None:
+                out = chunkerObj.workspace.get("read", chunk[1] - chunk[0], np.complex64)
+            return comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*chunk, out = out), chunkerObj)
+        return comm.commSignal(frontEnd.sampRate, frontEnd.applyOn(self.__sigsrc.readRaw(*chunk)), chunkerObj)
 
     def __audio(self, audioFreq = constants.NOAA_AUDSAMPRATE, strictness = True):
 
@@ -609,109 +827,308 @@ class decode_noaa:
             :obj:`commSignal`: An audio signal
         '''
 
-        logging.info('Beginning FM demodulation to get audio in chunks')
+        fm = self.__fm()
+
+        # nothing to do if the rate would not change
+        if not strictness and int(fm.sampRate / audioFreq) == 1:
+            return fm
+
+        return self.__product(("audio", audioFreq, strictness), lambda: self.__resampleAudio(fm, audioFreq, strictness))
+
+    def __resampleAudio(self, fm, audioFreq, strictness):
+
+        '''Bring the FM demodulated signal to an audio rate, in chunks of the same duration as the source chunks
+
+        Args:
+            fm (:obj:`commSignal`): FM demodulated signal
+            audioFreq (:obj:`int`): Target frequency of sampling of audio
+            strictness (:obj:`bool`): Strictness of sampling
+
+        Returns:
+            :obj:`commSignal`: An audio signal
+        '''
 
         audioOut = comm.commSignal(audioFreq)
-        bhFilter = filters.blackmanHarris(151)
-        fmDemdulator = demod_fm.demod_fm()
-        chunkerObj = chunker.chunker(self.__sigsrc)
+        chunkerObj = chunker.chunker(fm, chunkSize = max(1, int(constants.PROC_CHUNKSIZE * fm.sampRate / self.__sigsrc.sampFreq)))
 
         for i in chunkerObj.getChunks:
+            audioOut.extend(comm.commSignal(fm.sampRate, fm.signal[i[0]:i[1]], chunkerObj).bwLim(audioFreq, strictness))
 
-            logging.info('Processing chunk %d of %d chunks', chunkerObj.getChunks.index(i)+1, len(chunkerObj.getChunks))
+        return audioOut
 
-            sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(*i), chunkerObj).offsetFreq(self.__offset).filter(bhFilter).bwLim(self.__bw, uniq = "First").funcApply(fmDemdulator.demod).bwLim(audioFreq, strictness)
-            audioOut.extend(sig)
+    def __bandPassed(self):
 
-        logging.info('FM demodulation successfully complete')
-        self.__audOut = audioOut
+        '''Get the FM demodulated signal band passed to the APT subcarrier and its side bands, to remove any noise
 
-        return audioOut
+        Returns:
+            :obj:`commSignal`: Band passed signal
+        '''
+
+        fm = self.__fm()
+        bandPass = filters.butterSos(fm.sampRate, 400, 4400, typeFlt = constants.FLT_BP)
+        return comm.commSignal(fm.sampRate, filters.zeroPhaseStream(sos = bandPass.getSos).applyOn(fm.signal))
 
-    def __getAM(self, sig):
+    def __getAPT(self, sig, oversample = constants.NOAA_IMAGEOVERSAMPLE, passband = constants.AM_APT_PASSBAND):
 
-        '''Do AM demodulation in chunks of given signal
+        '''Do APT demodulation in chunks of given signal
 
         Args:
-            sig (:obj:`comm object`): Input signal
+            sig (:obj:`comm object`): Input audio signal
+            oversample (:obj:`int`, optional): output samples per APT word
+            passband (:obj:`float`, optional): bandwidth of the envelope in Hz
 
         Returns:
-            :obj:`commSignal`: AM demodulated signal
+            :obj:`commSignal`: APT envelope at 4160 * oversample Hz
         '''
 
-        logging.info('Beginning AM demodulation in chunks')
+        logging.info('Beginning APT demodulation in chunks')
 
-        amDemdulator = demod_am.demod_am()
-        amOut = comm.commSignal(sig.sampRate)
+        aptDemodulator = demod_am.demod_apt(sig.sampRate, oversample, passband)
+        amOut = comm.commSignal(aptDemodulator.sampRate)
 
         chunkerObj = chunker.chunker(sig, chunkSize = 60000*4)
 
+        # the envelope lags the input by the delay of the filter
+        skip = aptDemodulator.delay
+
         for i in chunkerObj.getChunks:
 
             logging.info('Processing chunk %d of %d chunks', chunkerObj.getChunks.index(i)+1, len(chunkerObj.getChunks))
-            demodSig = amDemdulator.demod(sig.signal[i[0]:i[1]])
-            amOut.extend(comm.commSignal(sig.sampRate, demodSig))
+            demodSig = aptDemodulator.demod(sig.signal[i[0]:i[1]])
+            drop = min(skip, len(demodSig))
+            skip -= drop
+            amOut.extend(comm.commSignal(aptDemodulator.sampRate, demodSig[drop:]))
 
-        logging.info('AM demodulation completed')
+        amOut.extend(comm.commSignal(aptDemodulator.sampRate, aptDemodulator.flush()[skip:]))
+
+        logging.info('APT demodulation completed')
 
         return amOut
 
-    def __correlate(self, haystack, needle):
+    def __syncNeedle(self, sampRate, sync, usePosNeedle = True):
+
+        '''Create the sync signal at a sampling frequency
 
-        '''Function to do normalised correlation
-        
         Args:
-            haystack (:obj:`numpy array`): Input signal
-            needle (:obj:`numpy array`): Sync signal
+            sampRate (:obj:`int`): sampling frequency in Hz
+            sync (:obj:`list`): Sync bits
+            usePosNeedle (:obj:`bool`, optional): levels of the sync as in the image (11 and 244), else +-0.5
 
         Returns:
-            :obj:`numpy array`: correlation array
+            :obj:`numpy array`: Sync signal
         '''
 
-        cor = signal.correlate(haystack, needle, mode = 'same')
-        sums = np.convolve(haystack * haystack, [1]*len(needle), mode = 'same')
-        norm = cor / (sums * np.sum(needle * needle))**0.5
-
-        return norm
+        sampRateCorrection = round(sampRate * constants.NOAA_T)
+        if usePosNeedle:
+            return ((np.repeat(sync, sampRateCorrection) * 233) + 11)/255
+        return np.repeat(sync, sampRateCorrection) - 0.5
 
-    def __correlateAndFindPeaks(self, sig, sync, getExtraInfo = False, useNormCorrelate = True, useFilter = False, usePosNeedle = True, filterType = filters.hamming(492, zeroPhase = True)):
+    def __correlateAndFindPeaks(self, sig, syncs, getExtraInfo = False, useNormCorrelate = True, useFilter = False, usePosNeedle = True, filterType = filters.hamming(492, zeroPhase = True)):
 
-        '''Correlates given signal and sync signal to find location of syncs
+        '''Correlates given signal and sync signals to find location of syncs, all syncs are correlated in one pass
 
         Args:
             sig (:obj:`comm object`): Input signal
-            sync (:obj:`list`): Sync bits
+            syncs (:obj:`list`): list of Sync bits, e.g. [constants.NOAA_SYNCA, constants.NOAA_SYNCB]
 
         Returns:
-            :obj:`list`: List of detected syncs
+            :obj:`list`: List of detected syncs for every sync (and their peak heights and time sync values if getExtraInfo)
         '''
 
         # create the sync signals, at required sampling frequency
-        sampRateCorrection = round(sig.sampRate * constants.NOAA_T)
-        if usePosNeedle:
-            sync = ((np.repeat(sync, sampRateCorrection) * 233) + 11)/255
-        else:
-            sync = np.repeat(sync, sampRateCorrection) - 0.5
+        needles = [self.__syncNeedle(sig.sampRate, i, usePosNeedle) for i in syncs]
 
         # uncomment below if exact sampling frequency is desired
         #sync = signal.resample(sync, int(sig.sampRate * len(sync)/(sampRateCorrection*1.0/constants.NOAA_T)))
 
         # correlate signal with syncs
-        cor = None
-        if not useNormCorrelate:
-            if useFilter:
-                cor = signal.correlate(filterType.applyOn(sig.signal), sync, mode = 'same')
-            else:
-                cor = signal.correlate(sig.signal, sync, mode = 'same')
-        else:
-            if useFilter:
-                cor = np.array(self.__correlate(filterType.applyOn(sig.signal), sync))
+        haystack = sig.signal
+        if useFilter:
+            haystack = filterType.applyOn(haystack)
+        cors = filters.correlator(needles, useNormCorrelate).applyOn(haystack)
+
+        results = []
+        for cor, needle in zip(cors, needles):
+            absolutePeaks = self.__findPeaks(cor, sig.sampRate, len(needle))
+
+            # get time sync values
+            if getExtraInfo:
+                pkHeights, timeSyncs = self.__peakInfo(sig.signal, cor, absolutePeaks, len(needle))
+                results.append((absolutePeaks, pkHeights, timeSyncs))
             else:
-                cor = np.array(self.__correlate(sig.signal, sync))
+                results.append(absolutePeaks)
+
+        return results
+
+    def __trackPeaks(self, sig, sync):
+
+        '''Find syncs by following the line period, the signal is correlated only around the predicted syncs
+
+        Lock is acquired by a full search of constants.NOAA_TRACKACQUIRE seconds, and again after
+        constants.NOAA_TRACKMAXMISSES syncs in a row were not found where they were predicted
+
+        Args:
+            sig (:obj:`comm object`): Input signal
+            sync (:obj:`list`): Sync bits
+
+        Returns:
+            :obj:`numpy array`: sorted locations of the beginning of the syncs
+        '''
+
+        x = sig.signal
+        needle = self.__syncNeedle(sig.sampRate, sync)
+        engine = filters.correlator([needle])
+        acquire = int(constants.NOAA_TRACKACQUIRE * sig.sampRate)
+
+        peaks = []
+        position = 0
+        while position + len(needle) < len(x):
+
+            # acquisition by a full search
+            segment = x[position:position + acquire]
+            lock = self.__acquireLock(segment, sig.sampRate, needle, engine)
+            start = position
+            position += len(segment)
+
+            if lock is None:
+                continue
+
+            locked, period, threshold = lock
+            peaks.extend(locked + start)
+
+            # tracking, one small window per line
+            last = locked[-1] + start
+            misses = 0
+            while misses < constants.NOAA_TRACKMAXMISSES:
+                expected = int(round(last + (misses + 1) * period))
+                first = expected - constants.NOAA_TRACKWIDTH
+                if first < 0 or expected + constants.NOAA_TRACKWIDTH + len(needle) > len(x):
+                    position = len(x)
+                    break
+
+                height = self.__windowHeights(x[first:expected + constants.NOAA_TRACKWIDTH + len(needle)], needle)
+
+                if np.max(height) >= threshold:
+                    peak = first + np.argmax(height)
+                    period += constants.NOAA_TRACKGAIN * ((peak - last) / (misses + 1) - period)
+                    peaks.append(peak)
+                    last = peak
+                    misses = 0
+                else:
+                    misses += 1
+
+            # lock lost, search again from the last sync found
+            if position < len(x):
+                position = last + len(needle)
+
+        return np.sort(np.array(peaks, dtype = int))
+
+    def __acquireLock(self, segment, sampRate, needle, engine):
+
+        '''Search a segment for syncs spaced by a line, to start tracking them
+
+        Args:
+            segment (:obj:`numpy array`): APT envelope
+            sampRate (:obj:`int`): sampling frequency in Hz
+            needle (:obj:`numpy array`): sync signal
+            engine (:obj:`correlator`): correlator of the needle
+
+        Returns:
+            :obj:`tuple`: locations of the syncs spaced by a line, line period and acceptance level of a sync, None if there are too few of them
+        '''
+
+        tolerance = constants.NOAA_TRACKTOLERANCE * sampRate * constants.NOAA_T
+
+        cor = engine.applyOn(segment)[0]
+        found = self.__findPeaks(cor, sampRate, len(needle))
+        found = found[(found >= 0) & (found + len(needle) <= len(segment))]
+        spacing = np.abs(np.diff(found) - 0.5 * sampRate) <= tolerance
+
+        if np.sum(spacing) < constants.NOAA_TRACKLOCKSYNCS - 1:
+            return None
+
+        locked = found[np.concatenate([spacing, [False]]) | np.concatenate([[False], spacing])]
+
+        # the acceptance level is between the typical correlation and the height of the syncs
+        period = np.median(np.diff(found)[spacing])
+        baseline = np.median(cor)
+        threshold = baseline + constants.NOAA_TRACKMINPEAK * (np.median(cor[locked + int(len(needle)/2)]) - baseline)
+
+        return locked, period, threshold
+
+    def __windowHeights(self, x, needle):
+
+        '''Normalized correlation of the needle at every start in a small window
+
+        Args:
+            x (:obj:`numpy array`): window of the APT envelope
+            needle (:obj:`numpy array`): sync signal
+
+        Returns:
+            :obj:`numpy array`: correlation at the len(x) - len(needle) + 1 starts
+        '''
+
+        x = np.asarray(x)
+        windows = np.lib.stride_tricks.as_strided(x, shape = (len(x) - len(needle) + 1, len(needle)), strides = (x.strides[0], x.strides[0]))
+        return (windows @ needle) / (np.sum(windows * windows, axis = -1) * np.sum(needle * needle))**0.5
+
+    def __refinePeaks(self, sig, peaks, sync, factor):
+
+        '''Locate syncs found at a low rate at a 'factor' times higher rate, the signal is interpolated only around them
+
+        Args:
+            sig (:obj:`comm object`): Input signal at the low rate
+            peaks (:obj:`numpy array`): locations of the beginning of the syncs at the low rate
+            sync (:obj:`list`): Sync bits
+            factor (:obj:`int`): ratio of the rates
+
+        Returns:
+            :obj:`numpy array`: sorted locations of the beginning of the syncs at the high rate
+        '''
+
+        if factor == 1 or len(peaks) == 0:
+            return peaks
+
+        needle = self.__syncNeedle(sig.sampRate * factor, sync)
+        width, pad = constants.NOAA_SYNCREFINEWIDTH, constants.NOAA_SYNCREFINEPAD
+
+        # windows at the low rate, covering the sync shifted by upto 'width' samples either way, and the interpolation filter
+        first = np.asarray(peaks) - width - pad
+        length = -(-len(needle) // factor) + 2 * (width + pad)
+        padded = np.concatenate([np.zeros(length), sig.signal, np.zeros(length)])
+        candidates = 2 * width * factor + 1
+
+        refined = np.empty(len(peaks), dtype = int)
+        for i in range(0, len(peaks), constants.NOAA_LINEBATCH):
+            index = first[i:i + constants.NOAA_LINEBATCH, None] + length + np.arange(length)
+            windows = signal.resample_poly(padded[index], factor, 1, axis = -1)
+
+            # normalized correlation at every candidate start, as the sliding one would give
+            energy = np.concatenate([np.zeros((len(windows), 1)), np.cumsum(windows * windows, axis = -1)], axis = -1)
+            shifted = np.lib.stride_tricks.as_strided(windows[:, pad * factor:], shape = (len(windows), candidates, len(needle)), strides = (windows.strides[0], windows.strides[1], windows.strides[1]))
+            sums = energy[:, pad * factor + len(needle):pad * factor + len(needle) + candidates] - energy[:, pad * factor:pad * factor + candidates]
+            cor = (shifted @ needle) / (np.maximum(sums, 0) * np.sum(needle * needle))**0.5
+
+            refined[i:i + len(windows)] = (first[i:i + constants.NOAA_LINEBATCH] + pad) * factor + np.argmax(cor, axis = -1)
+
+        return np.sort(refined)
+
+    def __findPeaks(self, cor, sampRate, syncLen):
+
+        '''Find the sync peaks in a correlation
+
+        Args:
+            cor (:obj:`numpy array`): correlation of the signal with the sync
+            sampRate (:obj:`int`): sampling frequency in Hz
+            syncLen (:obj:`int`): length of the sync signal
+
+        Returns:
+            :obj:`numpy array`: sorted locations of the beginning of the syncs
+        '''
 
         # now to find peaks
         # in a second long signal we will expect two peaks, similarly here
-        expectedPeaks = int(2*(len(cor) / sig.sampRate)) + 2
+        expectedPeaks = int(2*(len(cor) / sampRate)) + 2
 
         # find indices top expectedPeak number of values
         maxk = np.argpartition(cor, -1*expectedPeaks)[-1*expectedPeaks:]
@@ -726,7 +1143,7 @@ class decode_noaa:
         possiblePeaks = np.sort(np.argwhere(cor > avgpk).ravel())
 
         # minimum distance between peaks is about 0.45 seconds i.e. 50 ms wiggle room
-        minPkDist = constants.NOAA_MINPEAKDIST * sig.sampRate
+        minPkDist = constants.NOAA_MINPEAKDIST * sampRate
 
         absolutePeaks = []
         currentMax = None
@@ -746,56 +1163,69 @@ class decode_noaa:
         absolutePeaks.append(currentMaxIndex)
 
         # offset it to the beginning of the sync
-        absolutePeaks = [i - int(len(sync)/2) for i in absolutePeaks]
+        absolutePeaks = [i - int(syncLen/2) for i in absolutePeaks]
+
+        return np.sort(np.array(absolutePeaks).ravel())
+
+    def __peakInfo(self, sig, cor, peaks, syncLen):
+
+        '''Get the peak heights and the time sync values (the average of the signal after the sync) of syncs
+
+        Args:
+            sig (:obj:`numpy array`): Input signal
+            cor (:obj:`numpy array`): correlation of the signal with the sync
+            peaks (:obj:`numpy array`): locations of the beginning of the syncs
+            syncLen (:obj:`int`): length of the sync signal
 
-        absolutePeaks = np.sort(np.array(absolutePeaks).ravel())
+        Returns:
+            :obj:`tuple`: list of peak heights and list of time sync values (None if the signal ends before)
+        '''
 
-        # get time sync values
         timeSyncs = []
         pkHeights = []
-        if getExtraInfo:
-            for i in absolutePeaks:
-                if i+2*int(len(sync)) < sig.length:
-                    timeSyncs.append(np.average(sig.signal[i+int(len(sync)):i+2*int(len(sync))]))
-                else:
-                    timeSyncs.append(None)
-                pkHeights.append(cor[i + int(len(sync)/2)])
-
-        if getExtraInfo:
-            return absolutePeaks, pkHeights, timeSyncs
+        for i in peaks:
+            if i+2*syncLen < len(sig):
+                timeSyncs.append(np.average(sig[i+syncLen:i+2*syncLen]))
+            else:
+                timeSyncs.append(None)
+            pkHeights.append(cor[i + int(syncLen/2)])
 
-        return absolutePeaks
+        return pkHeights, timeSyncs
         
-    def getCrudeSync(self):
+    def getCrudeSync(self, tracking = constants.NOAA_SYNCTRACKING):
 
-        '''Get the sync locations: at constants.NOAA_CRUDESYNCSAMPRATE sampling rate
+        '''Get the sync locations: at constants.NOAA_CRUDESYNCOVERSAMPLE samples per APT word, i.e. 41600 Hz
+
+        Args:
+            tracking (:obj:`bool`, optional): follow the line period and correlate only around predicted syncs, instead of searching the whole pass
 
         Returns:
             :obj:`list`: A list of locations of sync in sample number (start of sync)
         '''
 
         if self.__syncA is None or self.__syncB is None:
-            sig = self.__audio(constants.NOAA_CRUDESYNCSAMPRATE, False) 
+            # the APT envelope at a low multiple of the word rate, it holds the whole band of the envelope
+            sig = self.__product(("apt", constants.NOAA_COARSESYNCOVERSAMPLE, constants.NOAA_CRUDESYNCPASSBAND, False), lambda: self.__getAPT(self.__audio(constants.NOAA_CRUDESYNCSAMPRATE, False), constants.NOAA_COARSESYNCOVERSAMPLE, constants.NOAA_CRUDESYNCPASSBAND))
 
-            # first get the AM demodulated signal at required sampling rate
-            sig = self.__getAM(sig)
+            # syncs are found at the low rate, then located at the crude rate in small windows only
+            factor = constants.NOAA_CRUDESYNCOVERSAMPLE // constants.NOAA_COARSESYNCOVERSAMPLE
+            self.__syncCrudeSampRate = sig.sampRate * factor
 
-            self.__syncCrudeSampRate = sig.sampRate
+            logging.info('Beginning SyncA and SyncB detection')
+            coarseA, coarseB = [], []
+            if tracking:
+                coarseA, coarseB = self.__trackPeaks(sig, constants.NOAA_SYNCA), self.__trackPeaks(sig, constants.NOAA_SYNCB)
 
-            logging.info('Beginning SyncA detection')
-            self.__syncA = self.__correlateAndFindPeaks(sig, constants.NOAA_SYNCA)
-            logging.info('Done SyncA detection')
-
-            logging.info('Beginning SyncB detection')
-            self.__syncB = self.__correlateAndFindPeaks(sig, constants.NOAA_SYNCB)
-            logging.info('Done SyncB detection')
+            # without a lock on both syncs (e.g. no signal) the whole pass is searched
+            if min(len(coarseA), len(coarseB)) < constants.NOAA_DETECTCONSSYNCSNUM + 1:
+                coarseA, coarseB = self.__correlateAndFindPeaks(sig, [constants.NOAA_SYNCA, constants.NOAA_SYNCB])
+            self.__syncA = self.__refinePeaks(sig, coarseA, constants.NOAA_SYNCA, factor)
+            self.__syncB = self.__refinePeaks(sig, coarseB, constants.NOAA_SYNCB, factor)
+            logging.info('Done SyncA and SyncB detection')
 
             # determine if some data was found or not
-            syncAdiff = np.abs(np.diff(self.__syncA) - (self.__syncCrudeSampRate*0.5))
-            minSyncAdiff = np.min([np.max(syncAdiff[i:i+constants.NOAA_DETECTCONSSYNCSNUM]) for i in range(len(syncAdiff)-constants.NOAA_DETECTCONSSYNCSNUM+1)])
-
-            syncBdiff = np.abs(np.diff(self.__syncB) - (self.__syncCrudeSampRate*0.5))
-            minSyncBdiff = np.min([np.max(syncBdiff[i:i+constants.NOAA_DETECTCONSSYNCSNUM]) for i in range(len(syncBdiff)-constants.NOAA_DETECTCONSSYNCSNUM+1)])
+            minSyncAdiff = self.__syncSpacingError(self.__syncA)
+            minSyncBdiff = self.__syncSpacingError(self.__syncB)
 
             if minSyncAdiff < constants.NOAA_DETECTMAXCHANGE or minSyncBdiff < constants.NOAA_DETECTMAXCHANGE:
                 logging.info('NOAA Signal was found')
@@ -805,12 +1235,103 @@ class decode_noaa:
 
         return [self.__syncA, self.__syncB]
 
-    def getAccurateSync(self, useNormCorrelate = True):
+    def __syncSpacingError(self, syncs):
+
+        '''Smallest error of the sync spacing from half a second over constants.NOAA_DETECTCONSSYNCSNUM consecutive syncs
+
+        Args:
+            syncs (:obj:`numpy array`): locations of the syncs at the crude sync rate
+
+        Returns:
+            :obj:`float`: error in samples, infinite if there are too few syncs
+        '''
+
+        syncDiff = np.abs(np.diff(syncs) - (self.__syncCrudeSampRate*0.5))
+        if len(syncDiff) < constants.NOAA_DETECTCONSSYNCSNUM:
+            return np.inf
+
+        return np.min([np.max(syncDiff[i:i+constants.NOAA_DETECTCONSSYNCSNUM]) for i in range(len(syncDiff)-constants.NOAA_DETECTCONSSYNCSNUM+1)])
+
+    def __refineSyncs(self, csync, sync, searchSampleWidth, useNormCorrelate, workers):
+
+        '''Find the syncs at the source sampling rate in windows around crude ones, the windows are processed in batches
+
+        Args:
+            csync (:obj:`numpy array`): crude sync locations in source samples
+            sync (:obj:`list`): Sync bits
+            searchSampleWidth (:obj:`int`): half width of the search windows in source samples
+            useNormCorrelate (:obj:`bool`): Whether to use normalized correlation or not
+            workers (:obj:`int`): number of threads the batches are split across
+
+        Returns:
+            :obj:`tuple`: lists of sync locations, peak heights and time sync values
+        '''
+
+        starts = [int(i) - int(searchSampleWidth) for i in csync]
+        starts = np.array([i for i in starts if i >= 0 and i + 2 * int(searchSampleWidth) <= self.__sigsrc.length], dtype = int)
+        batches = [starts[i:i + constants.NOAA_SYNCBATCH] for i in range(0, len(starts), constants.NOAA_SYNCBATCH)]
+
+        # the oscillator, filters and correlation engine are shared by every window
+        width = 2 * int(searchSampleWidth)
+        needle = self.__syncNeedle(self.__sigsrc.sampFreq, sync, useNormCorrelate)
+        shared = (np.exp(-1.0j*2.0*np.pi*self.__offset*np.arange(width)/self.__sigsrc.sampFreq), filters.blackmanHarris(151, zeroPhase = True), filters.hamming(492, zeroPhase = True), filters.correlator([needle], useNormCorrelate), len(needle))
+        refine = lambda batch: self.__refineBatch(batch, width, shared)
+
+        if workers is None or workers <= 1 or len(batches) <= 1:
+            results = [refine(i) for i in batches]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+                results = list(pool.map(refine, batches))
+
+        return [sum([i[k] for i in results], []) for k in range(3)]
+
+    def __refineBatch(self, starts, width, shared):
+
+        '''Find the first sync in each of a batch of search windows
+
+        Args:
+            starts (:obj:`numpy array`): first source sample of every window
+            width (:obj:`int`): width of the windows in source samples
+            shared (:obj:`tuple`): oscillator bringing the signal to zero, RF filter, correlation filter, correlation engine and needle length
+
+        Returns:
+            :obj:`tuple`: lists of sync locations, peak heights and time sync values
+        '''
+
+        logging.info('Detecting %d syncs from sample %d', len(starts), starts[0])
+        oscillator, syncFilter, corFilter, engine, syncLen = shared
+
+        windows = np.empty((len(starts), width), dtype = np.complex64)
+        for i in range(len(starts)):
+            self.__sigsrc.read(starts[i], starts[i] + width, out = windows[i])
+        windows *= oscillator
+
+        # FM then AM demodulate every window
+        windows = syncFilter.applyOn(windows)
+        product = np.conj(windows[:, :-1])
+        product *= windows[:, 1:]
+        sig = np.abs(signal.hilbert(np.arctan2(product.imag, product.real), axis = -1))
+
+        haystack = corFilter.applyOn(sig)
+
+        syncs, pkHeights, timeSyncs = [], [], []
+        for i in range(len(starts)):
+            cor = engine.applyOn(haystack[i])[0]
+            peaks = self.__findPeaks(cor, self.__sigsrc.sampFreq, syncLen)
+            heights, times = self.__peakInfo(sig[i], cor, peaks[:1], syncLen)
+            syncs.append(peaks[0] + starts[i])
+            pkHeights.append(heights[0])
+            timeSyncs.append(times[0])
+
+        return syncs, pkHeights, timeSyncs
+
+    def getAccurateSync(self, useNormCorrelate = True, workers = constants.NOAA_SYNCWORKERS):
 
         '''Get the sync locations: at highest sampling rate
 
         Args:
             useNormCorrelate (:obj:`bool`, optional): Whether to use normalized correlation or not
+            workers (:obj:`int`, optional): number of threads the batches of search windows are split across
 
         Returns:
             :obj:`list`: A list of locations of sync in sample number (start of sync)
@@ -835,46 +1356,12 @@ class decode_noaa:
             csyncA *= self.__sigsrc.sampFreq
             csyncB *= self.__sigsrc.sampFreq
 
-            ## Accurate syncA
-            self.__asyncA = []
-            self.__asyncApk = []
-            self.__asyncAtime = []
             logging.info('Beginning Accurate SyncA detection')
-
-            for i in csyncA:
-
-                logging.info('Detecting Sync %d of %d syncs', list(csyncA).index(i) + 1, len(csyncA))
-
-                startI = int(i) - int(searchSampleWidth)
-                endI = int(i) + int(searchSampleWidth)
-                if startI < 0 or endI > self.__sigsrc.length:
-                    continue
-                sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(startI, endI)).offsetFreq(self.__offset).filter(filters.blackmanHarris(151, zeroPhase = True)).funcApply(demod_fm.demod_fm().demod).funcApply(demod_am.demod_am().demod)
-                syncDet, PkHeights, TimeSync = self.__correlateAndFindPeaks(sig, constants.NOAA_SYNCA, getExtraInfo = True, useNormCorrelate = useNormCorrelate, usePosNeedle = useNormCorrelate, useFilter = True)
-                self.__asyncA.append(syncDet[0] + startI)
-                self.__asyncApk.append(PkHeights[0])
-                self.__asyncAtime.append(TimeSync[0])
+            self.__asyncA, self.__asyncApk, self.__asyncAtime = self.__refineSyncs(csyncA, constants.NOAA_SYNCA, searchSampleWidth, useNormCorrelate, workers)
             logging.info('Accurate SyncA detection complete')
 
-            ## Accurate syncB
-            self.__asyncB = []
-            self.__asyncBpk = []
-            self.__asyncBtime = []
             logging.info('Beginning Accurate SyncB detection')
-
-            for i in csyncB:
-
-                logging.info('Detecting Sync %d of %d syncs', list(csyncB).index(i) + 1, len(csyncB))
-
-                startI = int(i) - int(searchSampleWidth)
-                endI = int(i) + int(searchSampleWidth)
-                if startI < 0 or endI > self.__sigsrc.length:
-                    continue
-                sig = comm.commSignal(self.__sigsrc.sampFreq, self.__sigsrc.read(startI, endI)).offsetFreq(self.__offset).filter(filters.blackmanHarris(151, zeroPhase = True)).funcApply(demod_fm.demod_fm().demod).funcApply(demod_am.demod_am().demod)
-                syncDet, PkHeights, TimeSync = self.__correlateAndFindPeaks(sig, constants.NOAA_SYNCB, getExtraInfo = True, useNormCorrelate = useNormCorrelate, usePosNeedle = useNormCorrelate, useFilter = True)
-                self.__asyncB.append(syncDet[0] + startI)
-                self.__asyncBpk.append(PkHeights[0])
-                self.__asyncBtime.append(TimeSync[0])
+            self.__asyncB, self.__asyncBpk, self.__asyncBtime = self.__refineSyncs(csyncB, constants.NOAA_SYNCB, searchSampleWidth, useNormCorrelate, workers)
             logging.info('Accurate SyncB detection complete')
 
         return [self.__asyncA, np.diff(self.__asyncA), self.__asyncApk, self.__asyncAtime, self.__asyncB, np.diff(self.__asyncB), self.__asyncBpk, self.__asyncBtime]
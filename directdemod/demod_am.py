@@ -4,6 +4,8 @@ Object for AM demodulation
 import numpy as np
 import scipy.signal as signal
 from directdemod import filters, constants
+from fractions import Fraction
+import math
 
 '''
 AM demodulation by hilbert's transform
@@ -18,6 +20,8 @@ class demod_am():
     def demod(self, sig):
 
         '''AM demodulation by hilbert's transform
+
+        Every call transforms the whole array and no state is kept, for a chunked APT signal use demod_apt
         
         Args:
             sig (:obj:`numpy array`): Signal array to be demdodulated
@@ -28,6 +32,107 @@ class demod_am():
 
         return np.abs(signal.hilbert(sig))
 
+'''
+APT demodulation by a product detector
+The audio is mixed down by the 2400 Hz subcarrier and coarsely decimated in one stage, then low pass
+filtered and resampled in one polyphase stage straight to a multiple of the APT word rate (4160 words/s),
+the magnitude is the envelope.
+No hilbert transform is needed and a line is a whole number of samples at the output
+'''
+
+class demod_apt():
+
+    '''
+    APT demodulation by a 2400 Hz quadrature product detector with built in resampling
+    '''
+
+    def __init__(self, Fs, oversample = constants.NOAA_IMAGEOVERSAMPLE, passband = constants.AM_APT_PASSBAND):
+
+        '''Initialize the object
+
+        Args:
+            Fs (:obj:`int`): sampling frequency of the audio in Hz
+            oversample (:obj:`int`, optional): output samples per APT word, the output is at 4160 * oversample Hz
+            passband (:obj:`float`, optional): bandwidth of the envelope in Hz, narrower is cheaper
+        '''
+
+        outRate = int(round(oversample / constants.NOAA_T))
+        carrier = constants.AM_APT_CARRIER
+        attenuation = constants.AM_APT_ATTENUATION
+
+        # mixing and a coarse integer decimation in one cheap stage, down to about four times the carrier,
+        # anything that would alias into the pass band is removed
+        decimation = max(1, int(Fs / (4.0 * carrier)))
+        midRate = Fraction(Fs).limit_denominator(1000) / decimation
+        b = [1.0]
+        mid = 0
+        if decimation > 1:
+            stopband = float(midRate) - passband
+            ntaps, beta = signal.kaiserord(attenuation, (stopband - passband) / (0.5 * Fs))
+            mid = int(math.ceil((ntaps - 1) / (2.0 * decimation)))
+            ntaps = 2 * decimation * mid + 1
+            b, = filters.cache.get(("demod_apt", ntaps, beta, passband, stopband, Fs), lambda: (signal.firwin(ntaps, (passband + stopband) / float(Fs), window = ('kaiser', beta)),))
+        self.__mixer = filters.xlatingDecimator(Fs, carrier, decimation, b = b)
+
+        # then the sharp low pass at the low rate, resampling straight to the output rate
+        ratio = (midRate / outRate).limit_denominator(constants.FLT_RESAMPLER_MAXUP)
+        up, down = ratio.denominator, ratio.numerator
+        self.__sampRate = float(midRate * up / down)
+
+        # pass the envelope, stop its image at twice the carrier and whatever would alias at the output
+        stopband = min(2 * carrier - passband, self.__sampRate - passband)
+        ntaps, beta = signal.kaiserord(attenuation, (stopband - passband) / (0.5 * float(midRate) * up))
+
+        # the taps are chosen so that the total delay is a whole number of output samples
+        self.__delay = int(math.ceil((mid * up + (ntaps - 1) / 2.0) / down))
+        ntaps = 2 * (self.__delay * down - mid * up) + 1
+        b, = filters.cache.get(("demod_apt", ntaps, beta, passband, stopband, midRate * up), lambda: (up * signal.firwin(ntaps, (passband + stopband) / float(midRate * up), window = ('kaiser', beta)),))
+        self.__resampler = filters.resampler(b, up, down)
+        self.__Fs = Fs
+
+    @property
+    def sampRate(self):
+
+        ''':obj:`float`: get the sampling frequency of the output in Hz'''
+
+        return self.__sampRate
+
+    @property
+    def delay(self):
+
+        ''':obj:`int`: get the delay of the output in output samples'''
+
+        return self.__delay
+
+    def demod(self, sig):
+
+        '''APT demodulation of the next chunk, the output is delayed by 'delay' samples
+
+        Args:
+            sig (:obj:`numpy array`): Audio signal array to be demdodulated
+
+        Returns:
+            :obj:`numpy array`: Envelope at 'sampRate'
+        '''
+
+        mixed = self.__mixer.applyOn(np.asarray(sig))
+
+        # the product has half the amplitude of the envelope
+        out = np.abs(self.__resampler.applyOn(mixed))
+        out *= 2
+        return out
+
+    def flush(self):
+
+        '''Get the last 'delay' output samples, still inside the filter at the end of the signal
+
+        Returns:
+            :obj:`numpy array`: Envelope at 'sampRate'
+        '''
+
+        n = int(math.ceil((self.__delay + 1) * self.__Fs / self.__sampRate)) + self.__mixer.decimation
+        return self.demod(np.zeros(n))[:self.__delay]
+
 '''
 AM demodulation by low pass filter
 '''
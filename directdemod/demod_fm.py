@@ -4,6 +4,64 @@ FM demodulation
 
 import numpy as np
 import scipy.signal as signal
+import directdemod.workspace as workspace
+
+'''
+Fast arctangent
+atan on [0, 1] is approximated by an odd polynomial (minimax, 9th order), the other
+octants follow by symmetry. The maximum error is 1.2e-5 radians, see experiment 8
+'''
+
+ATAN_COEFFS = [0.9998660, -0.3302995, 0.1801410, -0.0851330, 0.0208351]
+
+def fastAtan2(y, x, out = None, ws = None):
+
+    '''Approximate arctan2 of arrays, maximum absolute error 1.2e-5 radians
+
+    Args:
+        y (:obj:`numpy array`): y coordinates
+        x (:obj:`numpy array`): x coordinates
+        out (:obj:`numpy array`, optional): array to write the result to
+        ws (:obj:`workspace`, optional): workspace to borrow the scratch buffers from, with out given nothing is allocated once they exist
+
+    Returns:
+        :obj:`numpy array`: angles in radians, in [-pi, pi]
+    '''
+
+    if ws is None:
+        ws = workspace.workspace()
+
+    n = len(y)
+    dtype = np.result_type(y, x, np.float32)
+    ay = np.abs(y, out = ws.get("fastAtan2.ay", n, dtype))
+    ax = np.abs(x, out = ws.get("fastAtan2.ax", n, dtype))
+    swap = np.greater(ay, ax, out = ws.get("fastAtan2.swap", n, bool))
+    negative = np.less(x, 0, out = ws.get("fastAtan2.negative", n, bool))
+
+    # ratio in [0, 1] of the smaller to the larger coordinate, the tiny offset only matters at (0, 0)
+    a = np.minimum(ay, ax, out = ws.get("fastAtan2.a", n, dtype))
+    den = np.maximum(ay, ax, out = ay)
+    den += np.float32(1e-30)
+    a /= den
+    a2 = np.multiply(a, a, out = ax)
+
+    # Horner scheme in the buffers already borrowed
+    r = np.multiply(a2, np.float32(ATAN_COEFFS[-1]), out = den)
+    for c in ATAN_COEFFS[-2:0:-1]:
+        r += np.float32(c)
+        r *= a2
+    r += np.float32(ATAN_COEFFS[0])
+    r *= a
+
+    # the other octants by symmetry
+    np.subtract(np.float32(np.pi / 2), r, out = a2)
+    np.copyto(r, a2, where = swap)
+    np.subtract(np.float32(np.pi), r, out = a2)
+    np.copyto(r, a2, where = negative)
+
+    if out is None:
+        out = np.empty(n, dtype = dtype)
+    return np.copysign(r, y, out = out)
 
 '''
 Object for FM demodulation
@@ -15,40 +73,61 @@ class demod_fm():
     Object for FM demodulation
     '''
 
-    def __init__(self, storeState = True):
+    def __init__(self, storeState = True, fastAtan = False):
 
         '''Initialize the object
 
         Args:
             storeState (:obj:`bool`): Store state? Helps if signal is chunked
+            fastAtan (:obj:`bool`, optional): use the polynomial arctangent (fastAtan2) instead of np.arctan2
         '''
 
         self.__storeState = storeState
+        self.__fastAtan = fastAtan
         self.__last = None
+        self.__workspace = workspace.workspace()
 
-    def demod(self, sig):
+    def demod(self, sig, out = None):
 
         '''FM demod a given complex IQ array
 
         Args:
             sig (:obj:`numpy array`): numpy array with IQ in complex form
+            out (:obj:`numpy array`, optional): array to write the result to, it must hold len(sig) samples (len(sig) - 1 on the first call or without storeState)
 
         Returns:
-            :obj:`numpy array`: FM demodulated array
+            :obj:`numpy array`: FM demodulated array, float32 for complex64 input
         '''
 
-        sig_fmd = sig[1:] * np.conj(sig[:-1])
+        sig = np.asarray(sig)
+
+        # the sample across the chunk boundary is included if the last sample is known
+        carry = self.__storeState and not self.__last is None
+        n = len(sig) - 1 + int(carry)
+        if n < 0:
+            n = 0
+
+        # the product is formed in a buffer reused by every chunk
+        product = self.__workspace.get("product", n, np.result_type(sig.dtype, np.complex64))
 
-        if self.__storeState:
-            if self.__last is None:
-                self.__last = sig[-1]
-                return np.angle(sig_fmd)
-            else:
-                addCorrection = np.array([sig[0] * np.conj(self.__last)])
-                self.__last = sig[-1]
-                return np.angle(np.concatenate([addCorrection, sig_fmd]))
+        if len(sig) > 1:
+            body = product[int(carry):]
+            np.conjugate(sig[:-1], out = body)
+            body *= sig[1:]
+        if carry and len(sig) > 0:
+            product[0] = sig[0] * np.conj(self.__last)
+
+        if self.__storeState and len(sig) > 0:
+            self.__last = sig[-1]
+
+        if out is None:
+            out = np.empty(n, dtype = product.real.dtype)
         else:
-            return np.angle(sig_fmd)
+            out = out[:n]
+
+        if self.__fastAtan:
+            return fastAtan2(product.imag, product.real, out = out, ws = self.__workspace)
+        return np.arctan2(product.imag, product.real, out = out)
 
 '''
 Object for FM demodulation using angle differentiation
@@ -84,13 +163,18 @@ class demod_fmAD():
 
         anglesOfIQ = np.angle(sig)
 
-        if self.__storeState:
-            if self.__last is None:
-                self.__last = anglesOfIQ[-1]
-                return np.diff(np.unwrap(anglesOfIQ))
-            else:
-                addCorrection = np.array([self.__last])
-                self.__last = anglesOfIQ[-1]
-                return np.diff(np.unwrap(np.concatenate([addCorrection, anglesOfIQ])))
+        if self.__storeState and not self.__last is None:
+            diff = np.empty(len(anglesOfIQ), dtype = anglesOfIQ.dtype)
+            diff[0] = anglesOfIQ[0] - self.__last
+            np.subtract(anglesOfIQ[1:], anglesOfIQ[:-1], out = diff[1:])
         else:
-            return np.diff(np.unwrap(anglesOfIQ))
\ No newline at end of file
+            diff = np.diff(anglesOfIQ)
+
+        if self.__storeState and len(anglesOfIQ) > 0:
+            self.__last = anglesOfIQ[-1]
+
+        # wrapping the differences into [-pi, pi) is what unwrap followed by diff does
+        diff += np.pi
+        np.mod(diff, 2 * np.pi, out = diff)
+        diff -= np.pi
+        return diff
@@ -3,7 +3,170 @@ Object for filters
 '''
 
 import directdemod.constants as constants
+import directdemod.workspace as workspace
+import numpy as np
 import scipy.signal as signal
+import math, collections, hashlib, os, tempfile, threading
+from fractions import Fraction
+
+'''
+Cache of filter designs
+Designed coefficients (and initial states) are stored under a key describing the design,
+the least recently used ones are evicted and optionally all of them are kept on disk, so that
+repeated and batch jobs never design an identical filter twice
+'''
+
+class designCache:
+
+    '''
+    Keyed cache of filter designs with LRU eviction and an optional on-disk store
+    '''
+
+    def __init__(self, maxEntries = constants.FLT_DESIGNCACHE_SIZE, directory = constants.FLT_DESIGNCACHE_DIR):
+
+        '''Initialize the object
+
+        Args:
+            maxEntries (:obj:`int`, optional): number of designs kept in memory
+            directory (:obj:`str`, optional): directory of the on-disk store, disabled if None
+
+        '''
+
+        self.__entries = collections.OrderedDict()
+        self.__maxEntries = maxEntries
+        self.__directory = directory
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def hits(self):
+
+        ''':obj:`int`: number of designs found in the cache (memory or disk)'''
+
+        return self.__hits
+
+    @property
+    def misses(self):
+
+        ''':obj:`int`: number of designs that had to be computed'''
+
+        return self.__misses
+
+    def setDirectory(self, directory):
+
+        '''Set the directory of the on-disk store
+
+        Args:
+            directory (:obj:`str`): directory, None disables the on-disk store
+
+        '''
+
+        self.__directory = directory
+
+    def clear(self):
+
+        '''Remove all designs kept in memory'''
+
+        with self.__lock:
+            self.__entries.clear()
+
+    def get(self, key, design):
+
+        '''Get a design, designing it only if it is not cached
+
+        Args:
+            key (:obj:`tuple`): description of the design, may contain numbers, strings, lists and numpy arrays
+            design (:obj:`function`): called without arguments on a miss, must return a tuple of arrays
+
+        Returns:
+            :obj:`tuple`: tuple of read only numpy arrays
+        '''
+
+        key = repr(self.__normalize(key))
+
+        # the lock covers the in memory entries only, a design is computed outside of it
+        # and two threads missing the same key at once at worst design it twice
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                return self.__entries[key]
+
+        fileName = None
+        value = None
+        if not self.__directory is None:
+            fileName = os.path.join(self.__directory, hashlib.sha1(key.encode()).hexdigest() + ".npz")
+            try:
+                with np.load(fileName) as stored:
+                    if str(stored["key"]) == key:
+                        value = tuple(stored["arr_%d" % i] for i in range(len(stored.files) - 1))
+            except (IOError, OSError, KeyError, ValueError):
+                value = None
+
+        computed = value is None
+        if computed:
+            value = tuple(np.array(i) for i in design())
+            if not fileName is None:
+                self.__store(fileName, key, value)
+
+        for i in value:
+            i.flags.writeable = False
+
+        with self.__lock:
+            if computed:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__maxEntries:
+                self.__entries.popitem(last = False)
+
+        return value
+
+    def __store(self, fileName, key, value):
+
+        '''Write a design to the on-disk store, atomically so that concurrent jobs can share it
+
+        Args:
+            fileName (:obj:`str`): file of the design
+            key (:obj:`str`): normalized key
+            value (:obj:`tuple`): tuple of arrays
+
+        '''
+
+        try:
+            os.makedirs(self.__directory, exist_ok = True)
+            fd, tmpName = tempfile.mkstemp(dir = self.__directory, suffix = ".npz")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, *value, key = np.array(key))
+            os.replace(tmpName, fileName)
+        except (IOError, OSError):
+            pass
+
+    def __normalize(self, key):
+
+        '''Convert a key into a hashable form, arrays are replaced by a digest of their contents
+
+        Args:
+            key (:obj:`anything`): key or part of it
+
+        Returns:
+            :obj:`anything`: hashable key
+        '''
+
+        if isinstance(key, np.ndarray):
+            key = np.ascontiguousarray(key)
+            return ("array", key.dtype.str, key.shape, hashlib.sha1(key.tobytes()).hexdigest())
+        if isinstance(key, (list, tuple)):
+            return tuple(self.__normalize(i) for i in key)
+        if isinstance(key, np.generic):
+            return key.item()
+        return key
+
+# cache shared by all filters
+cache = designCache()
 
 '''
 Abstract model of a class, to keep the models consistent
@@ -12,81 +175,1411 @@ The general structure is as follows
 The goal of having such a parent abstract class is that, the children are forced to implement the required methods
 '''
 
-class filter:
+class filter:
+
+    '''
+    This is a parent object of all filters, it implements all the necessary properties. Refer to experiment 3 for details.
+    '''
+
+    def __init__(self, b, a, storeState = True, zeroPhase = False, initOut = None):
+
+        '''Initialize the object
+
+        Args:
+            b (:obj:`list`): list of 'b' constants of filter
+            a (:obj:`list`): list of 'a' constants of filter
+            storeState (:obj:`bool`, optional): Whether the filter state must be stored. Useful when filtering a chunked signal to avoid border effects.
+            zeroPhase (:obj:`bool`, optional): Whether the filter has to provide zero phase error to the input i.e. no delay in the output (Note: Enabling this will disable 'storeState' and 'initOut')
+            initOut (:obj:`list`, optional): Initial condition of the filter
+
+        '''
+
+        self.__storeState = storeState
+        self.__zeroPhase = zeroPhase
+        self.__initOut = initOut
+
+        if self.__storeState  and self.__zeroPhase:
+            self.__storeState = False
+
+        if (not self.__initOut == None) and self.__zeroPhase:
+            self.__initOut = None
+
+        # the coefficients are a shareable design, the state of this stream is kept apart from them
+        self.__design = filterDesign(b, a)
+        self.__state = None
+        if self.__storeState:
+            self.__state = self.__design.newState()
+
+        if not self.__initOut == None:
+            self.__state = None
+
+        self.__b = b
+        self.__a = a
+
+        # long FIR filters are faster by FFT convolution, lfilter_zi corresponds to past inputs of 1
+        self.__engine = None
+        if len(a) == 1 and len(b) >= constants.FLT_OVERLAPSAVE_MINTAPS and not self.__zeroPhase and self.__initOut is None:
+            self.__engine = overlapSave(np.asarray(b) / a[0])
+            if self.__storeState:
+                self.__engine.reset(np.ones(len(b) - 1))
+
+    def applyOn(self, x):
+
+        '''Apply the filter to a given array of signal
+
+        Args:
+            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+
+        Returns:
+            :obj:`numpy array`: Filtered signal array
+        '''
+
+        if not self.__engine is None:
+            if not self.__storeState:
+                self.__engine.reset()
+            return self.__engine.applyOn(x)
+
+        if self.__storeState:
+
+            if self.__state is None:
+                self.__state = filterState(signal.lfiltic(self.__b, self.__a, x, self.__initOut))
+
+            return self.__design.applyOn(self.__state, x)
+        else:
+            if self.__zeroPhase:
+                if len(self.__a) == 1 and len(self.__b) >= constants.FLT_OVERLAPSAVE_MINTAPS:
+                    return self.__filtfiltFIR(x)
+                return signal.filtfilt(self.__b, self.__a, x)
+            else:
+                return signal.lfilter(self.__b, self.__a, x)
+
+    def __filtfiltFIR(self, x):
+
+        '''signal.filtfilt of a long FIR filter by FFT convolution, along the last axis
+
+        Args:
+            x (:obj:`numpy array`): The signal array, rows of a 2-D array are filtered separately
+
+        Returns:
+            :obj:`numpy array`: Filtered signal array
+        '''
+
+        b = np.asarray(self.__b) / self.__a[0]
+        x = np.asarray(x)
+        padlen = 3 * len(b)
+        if x.shape[-1] <= padlen:
+            return signal.filtfilt(self.__b, self.__a, x)
+
+        # odd extension at both ends, as filtfilt
+        x = np.concatenate([2 * x[..., :1] - x[..., padlen:0:-1], x, 2 * x[..., -1:] - x[..., -2:-padlen - 2:-1]], axis = -1)
+
+        # lfilter_zi scaled by the first sample is a past input equal to it
+        for i in range(2):
+            x = np.concatenate([np.repeat(x[..., :1], len(b) - 1, axis = -1), x], axis = -1)
+            x = signal.fftconvolve(x, b.reshape((1,) * (x.ndim - 1) + (-1,)), mode = 'valid', axes = -1)[..., ::-1]
+
+        return x[..., padlen:-padlen]
+
+    @property
+    def getA(self):
+
+        ''':obj:`list`: Get 'a' of the filter'''
+
+        return self.__a
+
+    @property
+    def getB(self):
+        
+        ''':obj:`list`: Get 'b' of the filter'''
+
+        return self.__b
+
+    @property
+    def design(self):
+
+        ''':obj:`filterDesign`: Get the coefficients as a shareable design object'''
+
+        return self.__design
+
+'''
+Filter coefficients separated from filter state
+A filterDesign is immutable and can be shared by any number of streams or threads,
+each stream keeps its own lightweight filterState. Streams with blocks of equal length
+are filtered together by one vectorized call
+'''
+
+class filterDesign:
+
+    '''
+    Immutable filter coefficients, shareable between streams
+    '''
+
+    def __init__(self, b, a = [1]):
+
+        '''Initialize the object
+
+        Args:
+            b (:obj:`list`): list of 'b' constants of filter
+            a (:obj:`list`, optional): list of 'a' constants of filter
+
+        '''
+
+        self.__b = np.array(b)
+        self.__a = np.array(a)
+        self.__b.flags.writeable = False
+        self.__a.flags.writeable = False
+        self.__zi = None
+
+    @property
+    def getA(self):
+
+        ''':obj:`numpy array`: Get 'a' of the filter (read only)'''
+
+        return self.__a
+
+    @property
+    def getB(self):
+
+        ''':obj:`numpy array`: Get 'b' of the filter (read only)'''
+
+        return self.__b
+
+    def newState(self, steady = True):
+
+        '''Create the state of a new stream
+
+        Args:
+            steady (:obj:`bool`, optional): start as if past inputs were 1 (like filter does), else start from zeros
+
+        Returns:
+            :obj:`filterState`: state object
+        '''
+
+        if self.__zi is None:
+            self.__zi, = cache.get(("lfilter_zi", self.__b, self.__a), lambda: (self.__steadyState(),))
+
+        return filterState(self.__zi if steady else np.zeros(len(self.__zi)))
+
+    def __steadyState(self):
+
+        '''Initial state of the filter for past inputs of 1, as signal.lfilter_zi
+
+        Returns:
+            :obj:`numpy array`: initial state
+        '''
+
+        # for FIR filters it is a sum of taps, lfilter_zi would solve a (taps x taps) system
+        if len(self.__a) == 1:
+            return np.cumsum(self.__b[::-1])[::-1][1:] / self.__a[0]
+        return signal.lfilter_zi(self.__b, self.__a)
+
+    def applyOn(self, state, x):
+
+        '''Filter the next block of a stream
+
+        Args:
+            state (:obj:`filterState`): state of the stream, it is updated
+            x (:obj:`numpy array`): next block of the stream
+
+        Returns:
+            :obj:`numpy array`: Filtered block
+        '''
+
+        # lfilter does not give back the state for an empty block
+        if len(x) == 0:
+            return np.zeros(0, dtype = np.result_type(self.__b, self.__a, x, state.zi))
+
+        y, state.zi = signal.lfilter(self.__b, self.__a, x, zi = state.zi)
+        return y
+
+    def apply(self, states, blocks):
+
+        '''Filter the next block of many streams in one call
+
+        Args:
+            states (:obj:`list`): state of each stream, they are updated
+            blocks (:obj:`list`): next block of each stream, or a 2D array with one row per stream
+
+        Returns:
+            :obj:`list`: Filtered blocks, a 2D array if the blocks have equal length
+        '''
+
+        if not len(states) == len(blocks):
+            raise ValueError("One state per block must be given")
+
+        if len(blocks) == 0:
+            return []
+
+        # equal length blocks are stacked and filtered along the rows together
+        if len(set([len(i) for i in blocks])) == 1:
+            if len(blocks[0]) == 0:
+                return np.zeros((len(blocks), 0), dtype = np.result_type(self.__b, self.__a, *blocks))
+            zi = np.array([i.zi for i in states])
+            y, zf = signal.lfilter(self.__b, self.__a, np.asarray(blocks), axis = 1, zi = zi)
+            for state, i in zip(states, zf):
+                state.zi = i
+            return y
+
+        return [self.applyOn(state, x) for state, x in zip(states, blocks)]
+
+'''
+State of one stream of a filterDesign
+'''
+
+class filterState:
+
+    '''
+    Per stream filter state, the lfilter state is kept in the 'zi' attribute
+    '''
+
+    def __init__(self, zi):
+
+        '''Initialize the object
+
+        Args:
+            zi (:obj:`numpy array`): initial state of the filter
+
+        '''
+
+        self.__initial = np.array(zi)
+        self.zi = np.array(zi)
+
+    def reset(self):
+
+        '''Reset to the initial state'''
+
+        self.zi = self.__initial.copy()
+
+'''
+Streaming zero phase filter
+The forward pass is an ordinary stateful filter, the backward pass needs the future, so it is run on
+blocks which extend a settle margin past their end: by the time the backward filter reaches the block
+its start up error has decayed below the tolerance. The ends are padded like signal.filtfilt does, so the
+result matches filtfilt while only a block and a margin are ever held in memory
+'''
+
+class zeroPhaseStream:
+
+    '''
+    Forward-backward (zero phase) filter that works on a stream in bounded memory
+    The filter is given by its 'b' and 'a' constants, or by second order sections
+    '''
+
+    def __init__(self, b = None, a = None, blockSize = constants.FLT_ZEROPHASE_BLOCKSIZE, tolerance = constants.FLT_ZEROPHASE_TOLERANCE, sos = None):
+
+        '''Initialize the object
+
+        Args:
+            b (:obj:`list`, optional): list of 'b' constants of filter
+            a (:obj:`list`, optional): list of 'a' constants of filter
+            blockSize (:obj:`int`, optional): number of samples released by each backward pass
+            tolerance (:obj:`float`, optional): relative error allowed with respect to signal.filtfilt (signal.sosfiltfilt)
+            sos (:obj:`numpy array`, optional): second order sections of the filter, used instead of 'b' and 'a'
+
+        '''
+
+        self.__sos = None
+        if not sos is None:
+            # same padding as signal.sosfiltfilt
+            self.__sos = np.array(sos)
+            self.__b, self.__a = self.__sos[:, :3], self.__sos[:, 3:]
+            self.__padLen = 3 * (2 * len(self.__sos) + 1 - min(np.sum(self.__sos[:, 2] == 0), np.sum(self.__sos[:, 5] == 0)))
+            self.__zi, = cache.get(("sosfilt_zi", self.__sos), lambda: (signal.sosfilt_zi(self.__sos),))
+        elif b is None or a is None:
+            raise ValueError("Either 'b' and 'a' or 'sos' must be given")
+        else:
+            self.__b = np.asarray(b)
+            self.__a = np.asarray(a)
+            self.__padLen = 3 * max(len(self.__a), len(self.__b))
+            self.__zi, = cache.get(("lfilter_zi", self.__b, self.__a), lambda: (signal.lfilter_zi(self.__b, self.__a),))
+
+        self.__blockSize = int(blockSize)
+        self.__margin, = cache.get(("zeroPhaseMargin", self.__b, self.__a, tolerance), lambda: (np.array(self.__settle(tolerance)),))
+        self.__margin = int(self.__margin)
+        self.reset()
+
+    def reset(self):
+
+        '''Reset the state, to start a new stream'''
+
+        self.__head = []
+        self.__started = False
+        self.__state = None
+        self.__tail = np.zeros(0)
+        self.__pending = np.zeros(0)
+        self.__drop = self.__padLen
+
+    @property
+    def margin(self):
+
+        ''':obj:`int`: get the settle margin (and hence output lag) in samples'''
+
+        return self.__margin
+
+    def __settle(self, tolerance):
+
+        '''Length of the impulse response until it decays below the tolerance
+
+        Args:
+            tolerance (:obj:`float`): relative level
+
+        Returns:
+            :obj:`int`: number of samples
+        '''
+
+        if self.__sos is None and len(self.__a) == 1:
+            return len(self.__b)
+
+        n = 1024
+        while True:
+            impulse = np.zeros(n)
+            impulse[0] = 1
+            h = np.abs(self.__filter(impulse)[0])
+            above = np.nonzero(h > tolerance * h.max())[0]
+            if above[-1] < n // 2 or n >= constants.FLT_ZEROPHASE_MAXMARGIN:
+                return int(min(above[-1] + 1, n))
+            n *= 2
+
+    def push(self, x):
+
+        '''Feed the next part of the stream
+
+        Args:
+            x (:obj:`numpy array`): next samples of the stream
+
+        Returns:
+            :obj:`numpy array`: the filtered samples that are ready, lagging the input by about the margin
+        '''
+
+        x = np.asarray(x)
+
+        # the start is padded with an odd extension, which needs the first samples
+        if not self.__started:
+            self.__head.append(x)
+            if sum([len(i) for i in self.__head]) <= self.__padLen:
+                return np.zeros(0, dtype = np.result_type(self.__b, self.__a, x))
+            x = np.concatenate(self.__head)
+            self.__head = []
+            self.__started = True
+            ext = 2 * x[0] - x[self.__padLen:0:-1]
+            self.__state = self.__zi * ext[0]
+            self.__forward(ext)
+
+        self.__forward(x)
+        self.__tail = np.concatenate([self.__tail, x])[-(self.__padLen + 1):]
+
+        out = []
+        while len(self.__pending) >= self.__blockSize + self.__margin:
+            seg = self.__pending[:self.__blockSize + self.__margin]
+            back = self.__filter(seg[::-1], self.__zi * seg[-1])[0][::-1]
+            out.append(back[:self.__blockSize])
+            self.__pending = self.__pending[self.__blockSize:]
+
+        return self.__release(out)
+
+    def flush(self):
+
+        '''End the stream
+
+        Returns:
+            :obj:`numpy array`: the remaining filtered samples
+        '''
+
+        if not self.__started:
+            x = np.concatenate(self.__head) if len(self.__head) > 0 else np.zeros(0)
+            self.reset()
+            if not self.__sos is None:
+                return signal.sosfiltfilt(self.__sos, x)
+            return signal.filtfilt(self.__b, self.__a, x)
+
+        tail = self.__tail
+        self.__forward(2 * tail[-1] - tail[-2::-1])
+
+        seg = self.__pending
+        back = self.__filter(seg[::-1], self.__zi * seg[-1])[0][::-1]
+
+        # the odd extension of the end is not part of the output
+        out = self.__release([back[:len(back) - self.__padLen]])
+        self.reset()
+        return out
+
+    def applyOn(self, x, out = None):
+
+        '''Apply the filter to a whole array, block by block
+
+        Args:
+            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+            out (:obj:`numpy array`, optional): array to write the result to, may be x itself
+
+        Returns:
+            :obj:`numpy array`: Filtered signal array
+        '''
+
+        if out is None:
+            out = np.empty(len(x), dtype = np.result_type(self.__b, self.__a, x))
+
+        self.reset()
+        pos = 0
+        for i in range(0, len(x), self.__blockSize):
+            part = self.push(x[i:i + self.__blockSize])
+            out[pos:pos + len(part)] = part
+            pos += len(part)
+        part = self.flush()
+        out[pos:pos + len(part)] = part
+
+        return out
+
+    def __forward(self, x):
+
+        '''Run the forward pass on the next samples, they are kept until the backward pass
+
+        Args:
+            x (:obj:`numpy array`): next samples
+        '''
+
+        y, self.__state = self.__filter(x, self.__state)
+        self.__pending = np.concatenate([self.__pending, y])
+
+    def __filter(self, x, zi = None):
+
+        '''One pass of the filter
+
+        Args:
+            x (:obj:`numpy array`): samples
+            zi (:obj:`numpy array`, optional): initial state, zero if not given
+
+        Returns:
+            :obj:`tuple`: filtered samples and the final state
+        '''
+
+        if not self.__sos is None:
+            if zi is None:
+                zi = np.zeros((len(self.__sos), 2))
+            return signal.sosfilt(self.__sos, x, zi = zi)
+        if zi is None:
+            zi = np.zeros(max(len(self.__a), len(self.__b)) - 1)
+        return signal.lfilter(self.__b, self.__a, x, zi = zi)
+
+    def __release(self, out):
+
+        '''Join the finished blocks, leaving out the padding at the start of the stream
+
+        Args:
+            out (:obj:`list`): finished blocks
+
+        Returns:
+            :obj:`numpy array`: samples to be released
+        '''
+
+        if len(out) == 0:
+            return np.zeros(0, dtype = self.__pending.dtype)
+
+        out = np.concatenate(out)
+        drop = min(self.__drop, len(out))
+        self.__drop -= drop
+        return out[drop:]
+
+'''
+Overlap-save FFT convolution for FIR filters
+The input is cut into overlapping blocks, each one is convolved by multiplying spectra
+The last (taps - 1) inputs are carried over so that chunks are filtered seamlessly
+'''
+
+class overlapSave:
+
+    '''
+    Overlap-save FFT convolution engine, costs O(log N) per sample instead of O(taps) like lfilter
+    '''
+
+    def __init__(self, b):
+
+        '''Initialize the object
+
+        Args:
+            b (:obj:`list`): list of 'b' constants (taps) of the FIR filter
+
+        '''
+
+        self.__b = np.asarray(b)
+        self.__ntaps = len(self.__b)
+
+        fftSize = _overlapSaveSize(self.__ntaps)
+        self.__fftSize = fftSize
+        self.__spectrum, self.__rspectrum = cache.get(("overlapSave", self.__b, fftSize), self.__spectra)
+        self.reset()
+
+    def __spectra(self):
+
+        '''Compute the spectra of the taps
+
+        Returns:
+            :obj:`tuple`: spectrum, and the one sided spectrum if the taps are real
+        '''
+
+        spectrum = np.fft.fft(self.__b, self.__fftSize)
+        rspectrum = np.zeros(0)
+        if not np.iscomplexobj(self.__b):
+            rspectrum = np.fft.rfft(self.__b, self.__fftSize)
+        return spectrum, rspectrum
+
+    def reset(self, history = None):
+
+        '''Reset the state of the filter
+
+        Args:
+            history (:obj:`numpy array`, optional): the (taps - 1) inputs preceding the next chunk, zeros if not given
+
+        '''
+
+        if history is None:
+            history = np.zeros(self.__ntaps - 1)
+        self.__history = np.asarray(history)
+
+    def applyOn(self, x, out = None):
+
+        '''Apply the filter to a given array of signal
+
+        Args:
+            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+            out (:obj:`numpy array`, optional): array to write the output into
+
+        Returns:
+            :obj:`numpy array`: Filtered signal array
+        '''
+
+        x = np.asarray(x)
+        n = len(x)
+        hist = self.__ntaps - 1
+        fftSize = self.__fftSize
+        isReal = not np.iscomplexobj(self.__b) and not np.iscomplexobj(x) and not np.iscomplexobj(self.__history)
+
+        if out is None:
+            out = np.empty(n, dtype = np.result_type(self.__b, x, self.__history))
+
+        def gather(seg, start, count):
+
+            # the inputs of this batch along with the preceding (taps - 1) samples
+            if start >= hist:
+                seg[:hist + count] = x[start - hist:start + count]
+            else:
+                seg[:hist - start] = self.__history[start:]
+                seg[hist - start:hist + count] = x[:start + count]
+            seg[hist + count:] = 0
+
+        for start, count, seg, spectrum in _overlapSaveBlocks(n, fftSize, self.__ntaps, gather, out.dtype, isReal):
+            if isReal:
+                res = np.fft.irfft(spectrum * self.__rspectrum, fftSize, axis = 1)
+            else:
+                res = np.fft.ifft(spectrum * self.__spectrum, axis = 1)
+            out[start:start + count] = res[:, hist:].ravel()[:count]
+
+        # store the last inputs for the next chunk
+        if n >= hist:
+            self.__history = np.array(x[n - hist:])
+        else:
+            self.__history = np.concatenate([self.__history[n:], x])
+
+        return out
+
+'''
+Sliding correlation with several templates
+Every template is correlated in the same overlap-save FFT pass, the spectrum of a block of signal
+is computed once and multiplied by the cached spectra of all templates. The sliding energy used to
+normalize the correlation is a difference of cumulative sums, restarted for every batch of blocks
+so that its precision does not depend on the length of the signal.
+'''
+
+class correlator:
+
+    '''
+    Normalized sliding correlation of a signal with several templates, as signal.correlate (mode 'same')
+    '''
+
+    def __init__(self, needles, normalize = True):
+
+        '''Initialize the object
+
+        Args:
+            needles (:obj:`list`): templates to correlate with, real arrays
+            normalize (:obj:`bool`, optional): divide by the energy of the signal under the template and of the template, silent windows (e.g. zero padding) give 0
+
+        '''
+
+        self.__needles = [np.asarray(i, dtype = float) for i in needles]
+        self.__normalize = normalize
+
+        # templates are placed in a common frame, their 'same' alignment puts sample len//2 of each one on the output
+        self.__lead = max([len(i) // 2 for i in self.__needles])
+        self.__shifts = [self.__lead - len(i) // 2 for i in self.__needles]
+        self.__span = max([self.__shifts[i] + len(self.__needles[i]) for i in range(len(self.__needles))])
+
+        fftSize = _overlapSaveSize(self.__span)
+        self.__fftSize = fftSize
+        self.__step = fftSize - self.__span + 1
+        self.__spectra = [cache.get(("correlator", self.__needles[i], self.__shifts[i], fftSize), lambda: (np.conj(np.fft.rfft(np.concatenate([np.zeros(self.__shifts[i]), self.__needles[i]]), fftSize)),))[0] for i in range(len(self.__needles))]
+        self.__energies = [np.sum(i * i) for i in self.__needles]
+
+    def applyOn(self, x):
+
+        '''Correlate a signal with every template
+
+        Args:
+            x (:obj:`numpy array`): real signal array
+
+        Returns:
+            :obj:`numpy array`: correlations of shape (templates, len(x))
+        '''
+
+        x = np.asarray(x, dtype = float)
+        n = len(x)
+        fftSize, step = self.__fftSize, self.__step
+        out = np.empty((len(self.__needles), n))
+
+        def gather(seg, start, count):
+
+            # signal from 'lead' samples before the batch, zero outside of it
+            first = start - self.__lead
+            seg[:] = 0
+            seg[max(0, -first):min(len(seg), n - first)] = x[max(0, first):min(n, first + len(seg))]
+
+        for start, count, seg, spectrum in _overlapSaveBlocks(n, fftSize, self.__span, gather):
+            if self.__normalize:
+                energy = np.concatenate([[0], np.cumsum(seg * seg)])
+
+                # windows with no more energy than the rounding of the cumulative sum are silent
+                floor = len(seg) * np.finfo(float).eps * energy[-1]
+
+            for i in range(len(self.__needles)):
+                cor = np.fft.irfft(spectrum * self.__spectra[i], fftSize, axis = 1)[:, :step].ravel()[:count]
+                if self.__normalize:
+                    shift, length = self.__shifts[i], len(self.__needles[i])
+                    sums = energy[shift + length:shift + length + count] - energy[shift:shift + count]
+                    silent = sums <= floor
+                    cor /= (np.where(silent, 1, sums) * self.__energies[i])**0.5
+                    cor[silent] = 0
+                    np.clip(cor, -1, 1, out = cor) # rounding in nearly silent windows
+                out[i, start:start + count] = cor
+
+        return out
+
+'''
+Decimating FIR filter
+Only the output samples that are kept are computed, by polyphase filtering (scipy's upfirdn)
+The filter history and the decimation phase are carried over between chunks
+'''
+
+class decimator:
+
+    '''
+    Decimating FIR filter, computes only the kept output samples
+    '''
+
+    def __init__(self, b, decimation):
+
+        '''Initialize the object
+
+        Args:
+            b (:obj:`list`): list of 'b' constants (taps) of the FIR filter
+            decimation (:obj:`int`): downsampling factor, one in every 'decimation' samples is kept
+
+        '''
+
+        self.__b = np.asarray(b)
+        self.__decimation = int(decimation)
+
+        if self.__decimation < 1:
+            raise ValueError("The decimation must be atleast 1")
+
+        # history is kept as a multiple of the decimation, so that the first kept output lands on a polyphase boundary
+        self.__histLen = -(-(len(self.__b) - 1) // self.__decimation) * self.__decimation
+        self.reset()
+
+    def reset(self):
+
+        '''Reset the state of the filter'''
+
+        self.__history = np.zeros(self.__histLen)
+        self.__skip = 0
+
+    @property
+    def decimation(self):
+
+        ''':obj:`int`: get the downsampling factor'''
+
+        return self.__decimation
+
+    @property
+    def getB(self):
+
+        ''':obj:`list`: Get 'b' of the filter'''
+
+        return self.__b
+
+    def outputType(self, dtype):
+
+        '''Type of the output for an input of a given type
+
+        Args:
+            dtype (:obj:`numpy dtype`): type of the input
+
+        Returns:
+            :obj:`numpy dtype`: type of the output
+        '''
+
+        return np.result_type(self.__b, dtype)
+
+    def applyOn(self, x, out = None):
+
+        '''Apply the filter to a given array of signal and downsample it
+
+        Args:
+            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+            out (:obj:`numpy array`, optional): array to write the output to, of type outputType, it must hold ceil(len(x) / decimation) samples
+
+        Returns:
+            :obj:`numpy array`: Filtered and downsampled signal array
+        '''
+
+        x = np.asarray(x)
+        if out is None:
+            out = np.empty(max(0, -(-(len(x) - self.__skip) // self.__decimation)), dtype = self.outputType(x.dtype))
+
+        pos = 0
+        for i in range(0, len(x), constants.PROC_BLOCKSIZE):
+            part = self.__applyOnBlock(x[i:i + constants.PROC_BLOCKSIZE])
+            out[pos:pos + len(part)] = part
+            pos += len(part)
+
+        return out[:pos]
+
+    def __applyOnBlock(self, x):
+
+        '''Filter and downsample one cache sized block
+
+        Args:
+            x (:obj:`numpy array`): The signal block
+
+        Returns:
+            :obj:`numpy array`: Filtered and downsampled block
+        '''
+
+        n = len(x)
+
+        # outputs are at x[skip], x[skip + decimation] ...
+        nOut = max(0, -(-(n - self.__skip) // self.__decimation))
+
+        ext = np.concatenate([self.__history, x])
+        first = self.__histLen // self.__decimation
+        out = signal.upfirdn(self.__b, ext[self.__skip:], 1, self.__decimation)[first:first + nOut]
+
+        self.__history = ext[len(ext) - self.__histLen:]
+        self.__skip += nOut * self.__decimation - n
+
+        return out
+
+'''
+Rational polyphase resampler
+Conceptually the input is upsampled by inserting (up - 1) zeros, low pass filtered and downsampled,
+only the kept outputs are computed and each of them only uses the taps of its polyphase branch
+'''
+
+class resampler:
+
+    '''
+    Stateful rational (up / down) polyphase resampler
+    '''
+
+    def __init__(self, b, up, down):
+
+        '''Initialize the object
+
+        Args:
+            b (:obj:`list`): taps of the low pass filter, designed at the upsampled rate (with a gain of 'up')
+            up (:obj:`int`): interpolation factor
+            down (:obj:`int`): decimation factor
+
+        '''
+
+        self.__up = int(up)
+        self.__down = int(down)
+
+        if self.__up < 1 or self.__down < 1:
+            raise ValueError("The interpolation and decimation must be atleast 1")
+
+        # every output uses at most this many inputs
+        self.__b = np.asarray(b)
+        self.__perPhase = -(-len(self.__b) // self.__up)
+
+        # inverse of up modulo down, to find where the next output falls
+        self.__inverse = _modInverse(self.__up, self.__down)
+
+        self.reset()
+
+    def reset(self):
+
+        '''Reset the state of the filter'''
+
+        self.__history = np.zeros(self.__perPhase)
+        self.__next = 0
+
+    @property
+    def up(self):
+
+        ''':obj:`int`: get the interpolation factor'''
+
+        return self.__up
+
+    @property
+    def down(self):
+
+        ''':obj:`int`: get the decimation factor'''
+
+        return self.__down
+
+    @property
+    def getB(self):
+
+        ''':obj:`list`: Get 'b' of the filter'''
+
+        return self.__b
+
+    def applyOn(self, x):
+
+        '''Resample a given array of signal
+
+        Args:
+            x (:obj:`numpy array`): The signal array to be resampled
+
+        Returns:
+            :obj:`numpy array`: Resampled signal array
+        '''
+
+        # every block costs upto 'down' leading zeros and a pass over the taps, so blocks are long compared to it
+        x = np.asarray(x)
+        blockSize = max(constants.PROC_BLOCKSIZE, 16 * self.__down)
+        parts = [self.__applyOnBlock(x[i:i + blockSize]) for i in range(0, len(x), blockSize)]
+
+        if len(parts) == 0:
+            return np.zeros(0, dtype = np.result_type(self.__b, x))
+        return np.concatenate(parts)
+
+    def __applyOnBlock(self, x):
+
+        '''Resample one block
+
+        Args:
+            x (:obj:`numpy array`): The signal block
+
+        Returns:
+            :obj:`numpy array`: Resampled block
+        '''
+
+        up, down, H = self.__up, self.__down, self.__perPhase
+
+        # outputs are at upsampled positions next, next + down ... (relative to x[0]) before the end of x
+        nOut = max(0, -(-(len(x) * up - self.__next) // down))
+
+        # upfirdn computes outputs at multiples of down from the start of its input,
+        # leading zeros move that start until the next output falls on one of them
+        lead = 0
+        if down > 1:
+            lead = (-(H * up + self.__next) * self.__inverse) % down
+        first = ((lead + H) * up + self.__next) // down
+
+        ext = np.concatenate([np.zeros(lead, dtype = self.__history.dtype), self.__history, x])
+        out = signal.upfirdn(self.__b, ext, up, down)[first:first + nOut]
+
+        self.__next += nOut * down - len(x) * up
+        self.__history = ext[len(ext) - H:]
+
+        return out
+
+'''
+Frequency translating decimating FIR filter
+Mixing, low pass filtering and downsampling are done in one pass:
+the taps are rotated to the offset frequency instead of mixing every input sample,
+only the kept outputs are computed, and those are then brought to baseband
+'''
+
+class xlatingDecimator(decimator):
+
+    '''
+    Frequency translating decimating FIR filter (offsetFreq, filter and bwLim in one pass)
+    '''
+
+    def __init__(self, Fs, offset, decimation, cutoff = None, ntaps = None, b = None):
+
+        '''Initialize the object
+
+        Args:
+            Fs (:obj:`int`): sampling frequency of the input in Hz
+            offset (:obj:`float`): frequency in Hz to be brought to zero
+            decimation (:obj:`int`): downsampling factor, one in every 'decimation' samples is kept
+            cutoff (:obj:`float`, optional): cutoff of the low pass filter in Hz, defaults to half of the output sampling rate
+            ntaps (:obj:`int`, optional): number of taps of the low pass filter, defaults to constants.FLT_XLATING_TAPSPERPHASE per decimation phase
+            b (:obj:`list`, optional): low pass taps to use instead of designing them from cutoff and ntaps
+
+        '''
+
+        self.__Fs = Fs
+        self.__offset = offset
+
+        if b is None:
+            if cutoff is None:
+                cutoff = 0.5 * Fs / decimation
+            if ntaps is None:
+                ntaps = constants.FLT_XLATING_TAPSPERPHASE * int(decimation) + 1
+            b, = cache.get(("firwin", ntaps, cutoff / (0.5 * Fs)), lambda: (signal.firwin(ntaps, cutoff / (0.5 * Fs)),))
+
+        # mixing x[n] down by the offset before filtering equals filtering with taps mixed up by it and mixing the output down
+        b = np.asarray(b) * np.exp(2.0j * np.pi * offset * np.arange(len(b)) / Fs)
+        super(xlatingDecimator, self).__init__(b, decimation)
+
+    def reset(self):
+
+        '''Reset the state of the filter'''
+
+        super(xlatingDecimator, self).reset()
+        self.__position = 0
+
+    def applyOn(self, x, out = None):
+
+        '''Apply the filter to a given array of signal, translate its frequency and downsample it
+
+        Args:
+            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+            out (:obj:`numpy array`, optional): array to write the output to, of type outputType, it must hold ceil(len(x) / decimation) samples
+
+        Returns:
+            :obj:`numpy array`: Filtered, translated and downsampled signal array
+        '''
+
+        out = super(xlatingDecimator, self).applyOn(x, out)
+
+        # input sample number of the first output, the phase is wrapped before multiplying to keep precision
+        firstPhase = 2.0 * np.pi * math.fmod(self.__offset * self.__position, self.__Fs) / self.__Fs
+        out *= np.exp(-1.0j * (firstPhase + (2.0 * np.pi * self.__offset * self.decimation / self.__Fs) * np.arange(len(out))))
+        self.__position += len(out) * self.decimation
+
+        return out
+
+'''
+Integer front end for 8 bit recordings
+The raw unsigned bytes are mixed with a quantized NCO table in int16 (the products of 8 bit
+samples and 8 bit table entries fit exactly), and decimated by cascaded moving sums (CIC) in
+int32. The moving sums are computed in polyphase form, every output is the group of 'order'
+input blocks ending at it weighted by the CIC taps, so no serial integrators are needed.
+Floats appear only after the rate has dropped.
+Output k is the one decimator gives for the same taps (input k * decimation, a delay of
+order * (decimation - 1) / 2 input samples), the rounding of the NCO table adds an error below 0.6 % of the
+input magnitude, which the moving sums average down further.
+'''
+
+class intFrontEnd:
+
+    '''
+    Frequency translating CIC decimator working on raw 8 bit interleaved IQ
+    '''
+
+    def __init__(self, Fs, offset, decimation, order = constants.FLT_INTFRONTEND_ORDER):
+
+        '''Initialize the object
+
+        Args:
+            Fs (:obj:`int`): sampling frequency of the input in Hz
+            offset (:obj:`float`): frequency in Hz to be brought to zero, rounded to the nearest frequency the NCO table can hold
+            decimation (:obj:`int`): downsampling factor
+            order (:obj:`int`, optional): number of cascaded moving sums
+
+        '''
+
+        self.__decimation = int(decimation)
+        self.__order = int(order)
+
+        if self.__decimation < 1 or self.__order < 1:
+            raise ValueError("The decimation and order must be atleast 1")
+
+        # the NCO repeats every 'period' samples
+        ratio = Fraction(offset / Fs).limit_denominator(constants.FLT_INTFRONTEND_NCOSIZE)
+        self.__period = ratio.denominator
+        self.__offset = float(ratio * Fs)
+        self.__Fs = Fs
+
+        amplitude = 2**(constants.FLT_INTFRONTEND_NCOBITS - 1) - 1
+        self.__cos, self.__sin = cache.get(("intFrontEnd", ratio.numerator, self.__period, amplitude, constants.PROC_BLOCKSIZE), lambda: self.__table(ratio, amplitude))
+
+        # taps of the cascaded moving sums, padded to 'order' blocks of 'decimation' samples
+        taps = np.ones(self.__decimation, dtype = np.int64)
+        for i in range(self.__order - 1):
+            taps = np.convolve(taps, np.ones(self.__decimation, dtype = np.int64))
+        taps = np.concatenate([np.zeros(self.__order - 1, dtype = np.int64), taps])
+
+        # samples are 2 * (x - 127.5), the moving sums have a gain of decimation ** order
+        self.__scale = 1.0 / (2 * amplitude * self.__decimation ** self.__order)
+        if 2 * 255 * amplitude * self.__decimation ** self.__order < 2**31:
+            self.__accType = np.int32
+        else:
+            self.__accType = np.int64
+        self.__taps = taps.astype(self.__accType).reshape(self.__order, self.__decimation)
+
+        self.reset()
+
+    def __table(self, ratio, amplitude):
+
+        '''Quantized NCO table, one period followed by a block so that any block is a plain slice
+
+        Args:
+            ratio (:obj:`Fraction`): NCO frequency as a fraction of the sampling frequency
+            amplitude (:obj:`int`): peak value of the table
+
+        Returns:
+            :obj:`tuple`: cos and sin tables in int16
+        '''
+
+        phase = 2.0 * np.pi * ((ratio.numerator * np.arange(self.__period + constants.PROC_BLOCKSIZE)) % self.__period) / self.__period
+        return np.round(amplitude * np.cos(phase)).astype(np.int16), np.round(amplitude * np.sin(phase)).astype(np.int16)
+
+    def reset(self):
+
+        '''Reset the state of the filter'''
+
+        # the extra (decimation - 1) zeros align output k with input k * decimation, as decimator does
+        self.__position = 0
+        self.__history = np.zeros((2, self.__order * self.__decimation - 1), dtype = self.__accType)
+
+    @property
+    def decimation(self):
+
+        ''':obj:`int`: get the downsampling factor'''
+
+        return self.__decimation
+
+    @property
+    def offset(self):
+
+        ''':obj:`float`: get the frequency in Hz actually brought to zero'''
+
+        return self.__offset
+
+    @property
+    def sampRate(self):
+
+        ''':obj:`float`: get the output sampling frequency in Hz'''
+
+        return self.__Fs / self.__decimation
+
+    def applyOn(self, raw):
+
+        '''Translate and downsample raw IQ
+
+        Args:
+            raw (:obj:`numpy array`): unsigned 8 bit samples, I and Q interleaved
+
+        Returns:
+            :obj:`numpy array`: complex64 signal array at the output sampling frequency
+        '''
+
+        raw = np.asarray(raw).reshape(-1)
+        parts = [self.__applyOnBlock(raw[2*i:2*(i + constants.PROC_BLOCKSIZE)]) for i in range(0, len(raw) // 2, constants.PROC_BLOCKSIZE)]
+
+        if len(parts) == 0:
+            return np.zeros(0, dtype = np.complex64)
+        return np.concatenate(parts)
+
+    def __applyOnBlock(self, raw):
+
+        '''Translate and downsample one cache sized block
+
+        Args:
+            raw (:obj:`numpy array`): unsigned 8 bit samples, I and Q interleaved
+
+        Returns:
+            :obj:`numpy array`: complex64 downsampled block
+        '''
+
+        n = len(raw) // 2
+        phase = self.__position % self.__period
+        cos, sin = self.__cos[phase:phase + n], self.__sin[phase:phase + n]
+
+        i = raw[0:2*n:2].astype(np.int16)
+        i <<= 1
+        i -= 255
+        q = raw[1:2*n:2].astype(np.int16)
+        q <<= 1
+        q -= 255
+
+        # (i + jq)(cos - j sin) after the history, every product is exact in int16
+        h = self.__history.shape[1]
+        mixed = np.empty((2, h + n), dtype = self.__accType)
+        mixed[:, :h] = self.__history
+        mixed[0, h:] = i * cos
+        mixed[0, h:] += q * sin
+        mixed[1, h:] = q * cos
+        mixed[1, h:] -= i * sin
+        self.__position += n
+
+        # one output per complete group of 'decimation' samples, each one spans 'order' groups
+        outputs = (h + n) // self.__decimation - self.__order + 1
+        groups = mixed[:, :(outputs + self.__order - 1) * self.__decimation].reshape(2, -1, self.__decimation)
+        kept = np.zeros((2, outputs), dtype = self.__accType)
+        for k in range(self.__order):
+            kept += groups[:, k:k + outputs] @ self.__taps[k]
+        self.__history = mixed[:, outputs * self.__decimation:].copy()
+
+        out = np.empty(kept.shape[1], dtype = np.complex64)
+        out.real = kept[0]
+        out.imag = kept[1]
+        out *= np.float32(self.__scale)
+        return out
+
+'''
+Multi-stage decimation chain
+A large decimation is split into a cascade of smaller ones, early stages run at the high rate
+but only need to protect the final pass band, so they are short: a moving sum (CIC) or a half band.
+The last stage runs at a low rate and does the sharp filtering, compensating the droop of the moving sum.
+The cheapest cascade (in multiplies per input sample) is picked among the factorizations of the decimation.
+'''
+
+class decimationChain:
+
+    '''
+    Cascade of decimating FIR filters designed from a pass band, stop band and attenuation
+    '''
+
+    def __init__(self, Fs, decimation, passband, stopband = None, attenuation = constants.FLT_CHAIN_ATTENUATION, offset = None):
+
+        '''Initialize the object
+
+        Args:
+            Fs (:obj:`int`): sampling frequency of the input in Hz
+            decimation (:obj:`int`): total downsampling factor
+            passband (:obj:`float`): edge of the pass band in Hz
+            stopband (:obj:`float`, optional): start of the stop band in Hz, defaults to the output nyquist frequency
+            attenuation (:obj:`float`, optional): stop band attenuation in dB
+            offset (:obj:`float`, optional): frequency in Hz to be brought to zero by the first stage, see xlatingDecimator
+
+        '''
+
+        self.__Fs = Fs
+        self.__decimation = int(decimation)
+
+        if self.__decimation < 1:
+            raise ValueError("The decimation must be atleast 1")
+
+        if stopband is None:
+            stopband = 0.5 * Fs / self.__decimation
+
+        if not 0 < passband < stopband <= 0.5 * Fs:
+            raise ValueError("Invalid pass band or stop band")
+
+        plans = [self.__plan(i, passband, stopband, attenuation) for i in self.__factorizations(self.__decimation, constants.FLT_CHAIN_MAXSTAGES)]
+        self.__cost, plan = min([i for i in plans if not i is None], key = lambda i: i[0])
+
+        self.__workspace = workspace.workspace()
+        self.__stages = []
+        for i in plan:
+            b, = cache.get(("decimationChain",) + i, lambda: (self.__design(*i),))
+            if len(self.__stages) == 0 and not offset is None:
+                self.__stages.append(xlatingDecimator(Fs, offset, i[1], b = b))
+            else:
+                self.__stages.append(decimator(b, i[1]))
+
+    @property
+    def decimation(self):
 
-    '''
-    This is a parent object of all filters, it implements all the necessary properties. Refer to experiment 3 for details.
-    '''
+        ''':obj:`int`: get the total downsampling factor'''
 
-    def __init__(self, b, a, storeState = True, zeroPhase = False, initOut = None):
+        return self.__decimation
 
-        '''Initialize the object
+    @property
+    def stages(self):
+
+        ''':obj:`list`: get the decimator objects of the cascade'''
+
+        return self.__stages
+
+    @property
+    def cost(self):
+
+        ''':obj:`float`: get the estimated number of multiplies per input sample'''
+
+        return self.__cost
+
+    def reset(self):
+
+        '''Reset the state of all stages'''
+
+        for i in self.__stages:
+            i.reset()
+
+    def outputType(self, dtype):
+
+        '''Type of the output for an input of a given type
 
         Args:
-            b (:obj:`list`): list of 'b' constants of filter
-            a (:obj:`list`): list of 'a' constants of filter
-            storeState (:obj:`bool`, optional): Whether the filter state must be stored. Useful when filtering a chunked signal to avoid border effects.
-            zeroPhase (:obj:`bool`, optional): Whether the filter has to provide zero phase error to the input i.e. no delay in the output (Note: Enabling this will disable 'storeState' and 'initOut')
-            initOut (:obj:`list`, optional): Initial condition of the filter
+            dtype (:obj:`numpy dtype`): type of the input
 
+        Returns:
+            :obj:`numpy dtype`: type of the output
         '''
 
-        self.__storeState = storeState
-        self.__zeroPhase = zeroPhase
-        self.__initOut = initOut
+        for i in self.__stages:
+            dtype = i.outputType(dtype)
+        return dtype
 
-        if self.__storeState  and self.__zeroPhase:
-            self.__storeState = False
+    def applyOn(self, x, out = None):
 
-        if (not self.__initOut == None) and self.__zeroPhase:
-            self.__initOut = None
+        '''Apply the cascade to a given array of signal
 
-        if self.__storeState:
-            self.__zi = signal.lfilter_zi(b, a)
+        Args:
+            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+            out (:obj:`numpy array`, optional): array to write the output to, of type outputType, it must hold ceil(len(x) / decimation) samples
 
-        if not self.__initOut == None:
-            self.__zi = None
+        Returns:
+            :obj:`numpy array`: Filtered and downsampled signal array
+        '''
 
-        self.__b = b
-        self.__a = a
+        # the outputs of the inner stages never leave the chain, their buffers are reused by every chunk
+        for i in range(len(self.__stages)):
+            stage = self.__stages[i]
+            buf = out
+            if i < len(self.__stages) - 1:
+                buf = self.__workspace.get("stage%d" % i, -(-len(x) // stage.decimation), stage.outputType(np.asarray(x).dtype))
+            x = stage.applyOn(x, buf)
+        return x
 
-    def applyOn(self, x):
+    def __factorizations(self, n, maxStages):
 
-        '''Apply the filter to a given array of signal
+        '''All ordered ways of writing n as a product of factors
 
         Args:
-            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+            n (:obj:`int`): number to be factorized
+            maxStages (:obj:`int`): maximum number of factors
 
         Returns:
-            :obj:`numpy array`: Filtered signal array
+            :obj:`list`: list of lists of factors
         '''
 
-        if self.__storeState:
+        result = [[n]]
+        if maxStages > 1:
+            for i in range(2, n):
+                if n % i == 0:
+                    result += [[i] + j for j in self.__factorizations(n // i, maxStages - 1)]
+        return result
 
-            if self.__zi is None:
-                self.__zi = signal.lfiltic(self.__b, self.__a, x, self.__initOut)
+    def __plan(self, factors, passband, stopband, attenuation):
 
-            retDat, self.__zi = signal.lfilter(self.__b, self.__a, x, zi = self.__zi)
-            return retDat
-        else:
-            if self.__zeroPhase:
-                return signal.filtfilt(self.__b, self.__a, x)
-            else:
-                return signal.lfilter(self.__b, self.__a, x)
+        '''Plan the stages for a given factorization
 
-    @property
-    def getA(self):
+        Args:
+            factors (:obj:`list`): decimation of each stage
+            passband (:obj:`float`): edge of the pass band in Hz
+            stopband (:obj:`float`): start of the final stop band in Hz
+            attenuation (:obj:`float`): stop band attenuation in dB
 
-        ''':obj:`list`: Get 'a' of the filter'''
+        Returns:
+            :obj:`tuple`: estimated cost and list of stage designs, None if the factorization is not possible
+        '''
 
-        return self.__a
+        rate = float(self.__Fs)
+        total = 1
+        cost = 0.0
+        cic = ()
+        plan = []
 
-    @property
-    def getB(self):
-        
-        ''':obj:`list`: Get 'b' of the filter'''
+        for i, dec in enumerate(factors):
 
-        return self.__b
+            total *= dec
+            last = i == len(factors) - 1
+
+            # intermediate stages only need to keep aliases out of the pass band
+            edge = stopband if last else rate / dec - passband
+            if edge <= passband:
+                return None
+
+            if i == 0 and not last and dec >= 4:
+                order = self.__cicOrder(rate, dec, rate / dec - passband, attenuation)
+                if order <= constants.FLT_CHAIN_CICMAXORDER:
+                    cic = (rate, dec, order)
+                    plan.append(("cic", dec, rate, order))
+                    cost += (order * (dec - 1) + 1) / float(total) + constants.FLT_CHAIN_STAGECOST
+                    rate /= dec
+                    continue
+
+            ntaps, beta = signal.kaiserord(attenuation, (edge - passband) / (0.5 * rate))
+            ntaps += 1 - ntaps % 2
+            plan.append(("fir", dec, rate, ntaps, beta, passband, edge) + (cic if last else ()))
+            cost += ntaps / float(total) + constants.FLT_CHAIN_STAGECOST
+            rate /= dec
+
+        return cost, plan
+
+    def __cicOrder(self, rate, dec, alias, attenuation):
+
+        '''Lowest order of a moving sum that attenuates the first alias of the pass band enough
+
+        Args:
+            rate (:obj:`float`): input sampling frequency in Hz
+            dec (:obj:`int`): decimation
+            alias (:obj:`float`): lowest frequency in Hz that folds onto the pass band
+            attenuation (:obj:`float`): required attenuation in dB
+
+        Returns:
+            :obj:`int`: order
+        '''
+
+        gain = abs(self.__cicResponse(rate, dec, 1, alias))
+        if gain <= 0:
+            return 1
+        return int(math.ceil(attenuation / (-20.0 * math.log10(gain))))
+
+    def __cicResponse(self, rate, dec, order, f):
+
+        '''Frequency response of a normalized moving sum
+
+        Args:
+            rate (:obj:`float`): input sampling frequency in Hz
+            dec (:obj:`int`): length of the moving sum
+            order (:obj:`int`): number of cascaded moving sums
+            f (:obj:`numpy array`): frequencies in Hz
+
+        Returns:
+            :obj:`numpy array`: gain
+        '''
+
+        f = np.asarray(f, dtype = np.float64) / rate
+        num = np.sin(np.pi * f * dec)
+        den = dec * np.sin(np.pi * f)
+        return (np.where(f == 0, 1.0, num / np.where(f == 0, 1.0, den))) ** order
+
+    def __design(self, kind, dec, rate, *args):
+
+        '''Design the taps of a stage
+
+        Args:
+            kind (:obj:`str`): "cic" or "fir"
+            dec (:obj:`int`): decimation of the stage
+            rate (:obj:`float`): input sampling frequency of the stage in Hz
+            args: order for "cic", otherwise taps, kaiser beta, pass band, stop band and optionally the moving sum to compensate
+
+        Returns:
+            :obj:`numpy array`: taps
+        '''
+
+        if kind == "cic":
+            b = np.ones(1)
+            for i in range(args[0]):
+                b = np.convolve(b, np.ones(dec) / dec)
+            return b
+
+        ntaps, beta, passband, stopband = args[:4]
+        if len(args) == 4:
+            return signal.firwin(ntaps, (passband + stopband) / float(rate), window = ('kaiser', beta))
+
+        # ideal low pass up to the middle of the transition band, inverting the droop of the moving sum
+        freq = np.linspace(0, 0.5 * (passband + stopband), 32)
+        gain = 1.0 / self.__cicResponse(args[4], args[5], args[6], freq)
+        return signal.firwin2(ntaps, np.concatenate([freq, [freq[-1], 0.5 * rate]]) / (0.5 * rate), np.concatenate([gain, [0, 0]]), window = ('kaiser', beta))
 
 '''
 A simple rolling average filter
@@ -136,7 +1629,7 @@ class blackmanHarris(filter):
         '''
 
         self.__n = n
-        super(blackmanHarris, self).__init__(signal.blackmanharris(self.__n), [1], storeState, zeroPhase, initOut)
+        super(blackmanHarris, self).__init__(cache.get(("blackmanharris", self.__n), lambda: (signal.blackmanharris(self.__n),))[0], [1], storeState, zeroPhase, initOut)
 
 '''
 Blackman Harris filter (by convolving)
@@ -196,7 +1689,7 @@ class hamming(filter):
         '''
 
         self.__n = n
-        super(hamming, self).__init__(signal.hamming(self.__n), [1], storeState, zeroPhase, initOut)
+        super(hamming, self).__init__(cache.get(("hamming", self.__n), lambda: (signal.hamming(self.__n),))[0], [1], storeState, zeroPhase, initOut)
 
 '''
 Gaussian filter
@@ -223,7 +1716,7 @@ class gaussian(filter):
 
         self.__n = n
         self.__sigma = sigma
-        super(gaussian, self).__init__(signal.gaussian(self.__n, self.__sigma), [1], storeState, zeroPhase, initOut)
+        super(gaussian, self).__init__(cache.get(("gaussian", self.__n, self.__sigma), lambda: (signal.gaussian(self.__n, self.__sigma),))[0], [1], storeState, zeroPhase, initOut)
 
 '''
 Butterworth filter
@@ -256,22 +1749,199 @@ class butter(filter):
         self.__n = n
         self.__type = typeFlt
 
-        if (self.__type == constants.FLT_BP or self.__type == constants.FLT_BS) and self.__cutoffB is None:
-            raise ValueError("CutoffB must be given")
+        Wn, btype = _butterBand(Fs, cutoffA, cutoffB, typeFlt)
 
-        if self.__type == constants.FLT_LP:
-            self.__b, self.__a = signal.butter(self.__n, self.__cutoffA / (0.5 * self.__Fs), btype='lowpass')
-        elif self.__type == constants.FLT_HP:
-            self.__b, self.__a = signal.butter(self.__n, self.__cutoffA / (0.5 * self.__Fs), btype='highpass')
-        elif self.__type == constants.FLT_BP:
-            self.__b, self.__a = signal.butter(self.__n, [self.__cutoffA / (0.5 * self.__Fs), self.__cutoffB / (0.5 * self.__Fs)] , btype='bandpass')
-        elif self.__type == constants.FLT_BS:
-            self.__b, self.__a = signal.butter(self.__n, [self.__cutoffA / (0.5 * self.__Fs), self.__cutoffB / (0.5 * self.__Fs)] , btype='bandstop')
-        else:
-            raise ValueError("Invalid filter type")
+        self.__b, self.__a = cache.get(("butter", self.__n, Wn, btype), lambda: signal.butter(self.__n, Wn, btype = btype))
 
         super(butter, self).__init__(self.__b, self.__a, storeState, zeroPhase, initOut)
 
+'''
+Filter in second order sections
+High order IIR filters with narrow bands are numerically fragile in (b, a) form,
+as a cascade of biquads they stay stable even at high sampling rates
+'''
+
+class sosFilter:
+
+    '''
+    IIR filter in second order sections form, it has the same interface as the filter object
+    '''
+
+    def __init__(self, sos, storeState = True, zeroPhase = False):
+
+        '''Initialize the object
+
+        Args:
+            sos (:obj:`numpy array`): second order sections, array of shape (sections, 6)
+            storeState (:obj:`bool`, optional): Whether the filter state must be stored. Useful when filtering a chunked signal to avoid border effects.
+            zeroPhase (:obj:`bool`, optional): Whether the filter has to provide zero phase error to the input i.e. no delay in the output (Note: Enabling this will disable 'storeState')
+
+        '''
+
+        # sosfilt does not take the read only arrays of the design cache
+        self.__sos = np.array(sos)
+        self.__storeState = storeState and not zeroPhase
+        self.__zeroPhase = zeroPhase
+        self.__zi = None
+
+        if self.__storeState:
+            # same convention as filter: past inputs of 1
+            self.__zi, = cache.get(("sosfilt_zi", self.__sos), lambda: (signal.sosfilt_zi(self.__sos),))
+
+    def applyOn(self, x):
+
+        '''Apply the filter to a given array of signal
+
+        Args:
+            x (:obj:`numpy array`): The signal array on which the filter needs to be applied
+
+        Returns:
+            :obj:`numpy array`: Filtered signal array
+        '''
+
+        if self.__storeState:
+            retDat, self.__zi = signal.sosfilt(self.__sos, x, zi = self.__zi)
+            return retDat
+        elif self.__zeroPhase:
+            return signal.sosfiltfilt(self.__sos, x)
+        else:
+            return signal.sosfilt(self.__sos, x)
+
+    @property
+    def getSos(self):
+
+        ''':obj:`numpy array`: Get the second order sections of the filter'''
+
+        return self.__sos
+
+'''
+Butter worth filter in second order sections
+'''
+
+class butterSos(sosFilter):
+
+    '''
+    Butter worth filter in second order sections, stable for high orders and narrow bands
+    '''
+
+    def __init__(self, Fs, cutoffA, cutoffB = None, n = 6, typeFlt = constants.FLT_LP, storeState = True, zeroPhase = False):
+
+        '''Initialize the object
+
+        Args:
+            Fs (:obj:`int`): Sampling frequency of signal
+            cutoffA (:obj:`float`): desired cutoff A of filter in Hz
+            cutoffB (:obj:`float`, optional): desired cutoff B of filter in Hz
+            n (:obj:`int`, optional): Order of filter
+            type (:obj:`constant`, optional): constants.FLT_LP to constants.FLT_BS, see constants module
+            storeState (:obj:`bool`, optional): Whether the filter state must be stored. Useful when filtering a chunked signal to avoid border effects.
+            zeroPhase (:obj:`bool`, optional): Whether the filter has to provide zero phase error to the input i.e. no delay in the output (Note: Enabling this will disable 'storeState')
+
+        '''
+
+        Wn, btype = _butterBand(Fs, cutoffA, cutoffB, typeFlt)
+
+        sos, = cache.get(("butterSos", n, Wn, btype), lambda: (signal.butter(n, Wn, btype = btype, output = 'sos'),))
+
+        super(butterSos, self).__init__(sos, storeState, zeroPhase)
+
+def _modInverse(a, m):
+
+    '''Inverse of a modulo m by the extended Euclidean algorithm
+
+    Args:
+        a (:obj:`int`): number to invert
+        m (:obj:`int`): modulus
+
+    Returns:
+        :obj:`int`: x in [0, m) with a * x = 1 modulo m
+    '''
+
+    r0, r1, x0, x1 = m, a % m, 0, 1
+    while r1 > 0:
+        q = r0 // r1
+        r0, r1, x0, x1 = r1, r0 - q * r1, x1, x0 - q * x1
+
+    if not r0 == 1 and m > 1:
+        raise ValueError("The interpolation and decimation must not have a common factor")
+
+    return x0 % m
+
+def _overlapSaveSize(span):
+
+    '''FFT size of overlap-save blocks with the lowest cost per output sample
+
+    Args:
+        span (:obj:`int`): length of the filter, blocks overlap by (span - 1) samples
+
+    Returns:
+        :obj:`int`: FFT size, a power of two upto constants.FLT_OVERLAPSAVE_MAXFFT
+    '''
+
+    fftSize = 2**int(np.ceil(np.log2(2 * span)))
+    cost = lambda n: n * np.log2(n) / (n - span + 1)
+    while 2 * fftSize <= constants.FLT_OVERLAPSAVE_MAXFFT and cost(2 * fftSize) < cost(fftSize):
+        fftSize *= 2
+    return fftSize
+
+def _overlapSaveBlocks(n, fftSize, span, gather, dtype = float, isReal = True):
+
+    '''Spectra of the overlap-save blocks of a signal, in batches of about constants.FLT_OVERLAPSAVE_BATCH input samples
+
+    Args:
+        n (:obj:`int`): length of the signal
+        fftSize (:obj:`int`): FFT size
+        span (:obj:`int`): length of the filter, blocks overlap by (span - 1) samples
+        gather (:obj:`function`): gather(seg, start, count) fills seg with the (span - 1) samples before 'start', the 'count' samples from it and zeros after
+        dtype (:obj:`type`, optional): type of the samples
+        isReal (:obj:`bool`, optional): the samples are real, the one sided spectra are computed
+
+    Returns:
+        :obj:`generator`: start and length of every batch, its samples and the spectra of its blocks of shape (blocks, fftSize or fftSize // 2 + 1)
+    '''
+
+    step = fftSize - span + 1
+    blocksPerBatch = max(1, constants.FLT_OVERLAPSAVE_BATCH // fftSize)
+    seg = np.zeros(blocksPerBatch * step + span - 1, dtype = dtype)
+
+    for start in range(0, n, blocksPerBatch * step):
+        count = min(blocksPerBatch * step, n - start)
+        gather(seg, start, count)
+
+        blocks = np.lib.stride_tricks.as_strided(seg, shape = (-(-count // step), fftSize), strides = (step * seg.strides[0], seg.strides[0]))
+        if isReal:
+            yield start, count, seg, np.fft.rfft(blocks, axis = 1)
+        else:
+            yield start, count, seg, np.fft.fft(blocks, axis = 1)
+
+def _butterBand(Fs, cutoffA, cutoffB, typeFlt):
+
+    '''Normalized band edges and band type of a butter worth design
+
+    Args:
+        Fs (:obj:`int`): Sampling frequency of signal
+        cutoffA (:obj:`float`): cutoff A in Hz
+        cutoffB (:obj:`float`): cutoff B in Hz, required for band pass and band stop
+        typeFlt (:obj:`constant`): constants.FLT_LP to constants.FLT_BS
+
+    Returns:
+        :obj:`tuple`: Wn and btype as expected by scipy.signal.butter
+    '''
+
+    if (typeFlt == constants.FLT_BP or typeFlt == constants.FLT_BS) and cutoffB is None:
+        raise ValueError("CutoffB must be given")
+
+    if typeFlt == constants.FLT_LP:
+        return cutoffA / (0.5 * Fs), 'lowpass'
+    elif typeFlt == constants.FLT_HP:
+        return cutoffA / (0.5 * Fs), 'highpass'
+    elif typeFlt == constants.FLT_BP:
+        return (cutoffA / (0.5 * Fs), cutoffB / (0.5 * Fs)), 'bandpass'
+    elif typeFlt == constants.FLT_BS:
+        return (cutoffA / (0.5 * Fs), cutoffB / (0.5 * Fs)), 'bandstop'
+    else:
+        raise ValueError("Invalid filter type")
+
 '''
 Remez band filter
 '''
@@ -311,8 +1981,203 @@ class remez(filter):
         if not len(self.__bands) == 2*len(self.__gains):
             raise ValueError("Invalid bands/gains values")
 
-        super(remez, self).__init__(signal.remez(ntaps, self.__bands, self.__gains, Hz = Fs), [1], storeState, zeroPhase, initOut)
+        taps, = cache.get(("remez", ntaps, self.__bands, self.__gains, Fs), lambda: (signal.remez(ntaps, self.__bands, self.__gains, Hz = Fs),))
+        super(remez, self).__init__(taps, [1], storeState, zeroPhase, initOut)
+
+
+'''
+Specification designed FIR filter
+Instead of a fixed length window, the filter is designed from the pass band edges, transition width,
+ripple and attenuation actually needed. Kaiser window, Parks-McClellan (remez) and least squares designs
+are searched for the fewest taps that meet the specification, and the shortest one is used
+'''
+
+class minimumFir(filter):
+
+    '''
+    Shortest FIR filter (Kaiser, remez or least squares) meeting a given specification
+    '''
+
+    def __init__(self, Fs, cutoffA, transition, cutoffB = None, typeFlt = constants.FLT_LP, ripple = constants.FLT_SPEC_RIPPLE, attenuation = constants.FLT_SPEC_ATTENUATION, method = None, storeState = True, zeroPhase = False, initOut = None):
+
+        '''Initialize the object
+
+        Args:
+            Fs (:obj:`int`): Sampling frequency of signal
+            cutoffA (:obj:`float`): pass band edge A in Hz
+            transition (:obj:`float`): width of the transition bands in Hz, they lie outside the pass band
+            cutoffB (:obj:`float`, optional): pass band edge B in Hz, for band pass and band stop
+            typeFlt (:obj:`constant`, optional): constants.FLT_LP to constants.FLT_BS, see constants module
+            ripple (:obj:`float`, optional): maximum deviation of the pass band gain in dB
+            attenuation (:obj:`float`, optional): minimum stop band attenuation in dB
+            method (:obj:`str`, optional): "kaiser", "remez" or "firls", by default the one giving the fewest taps
+            storeState (:obj:`bool`, optional): Whether the filter state must be stored. Useful when filtering a chunked signal to avoid border effects.
+            zeroPhase (:obj:`bool`, optional): Whether the filter has to provide zero phase error to the input i.e. no delay in the output (Note: Enabling this will disable 'storeState' and 'initOut')
+            initOut (:obj:`list`, optional): Initial condition of the filter
+
+        '''
+
+        self.__Fs = Fs
+        self.__ripple = ripple
+        self.__attenuation = attenuation
+        self.__bands, self.__gains = self.__spec(Fs, cutoffA, cutoffB, transition, typeFlt)
+
+        methods = ["kaiser", "remez", "firls"] if method is None else [method]
+        for i in methods:
+            if not i in ["kaiser", "remez", "firls"]:
+                raise ValueError("Invalid design method")
+
+        taps, = cache.get(("minimumFir", Fs, self.__bands, self.__gains, ripple, attenuation, methods), lambda: (self.__shortest(methods),))
+
+        super(minimumFir, self).__init__(taps, [1], storeState, zeroPhase, initOut)
+
+    @property
+    def ntaps(self):
+
+        ''':obj:`int`: Get the number of taps of the filter'''
+
+        return len(self.getB)
+
+    def __spec(self, Fs, cutoffA, cutoffB, transition, typeFlt):
+
+        '''Convert the specification into bands and gains
+
+        Returns:
+            :obj:`tuple`: band edges in Hz (pairs, in increasing order) and gain of each band
+        '''
+
+        nyq = 0.5 * Fs
+
+        if (typeFlt == constants.FLT_BP or typeFlt == constants.FLT_BS) and cutoffB is None:
+            raise ValueError("CutoffB must be given")
+
+        if typeFlt == constants.FLT_LP:
+            bands, gains = [0, cutoffA, cutoffA + transition, nyq], [1, 0]
+        elif typeFlt == constants.FLT_HP:
+            bands, gains = [0, cutoffA - transition, cutoffA, nyq], [0, 1]
+        elif typeFlt == constants.FLT_BP:
+            bands, gains = [0, cutoffA - transition, cutoffA, cutoffB, cutoffB + transition, nyq], [0, 1, 0]
+        elif typeFlt == constants.FLT_BS:
+            bands, gains = [0, cutoffA, cutoffA + transition, cutoffB - transition, cutoffB, nyq], [1, 0, 1]
+        else:
+            raise ValueError("Invalid filter type")
+
+        if transition <= 0 or np.any(np.diff(bands) <= 0):
+            raise ValueError("Invalid band edges or transition width")
+
+        return tuple(bands), tuple(gains)
+
+    def __shortest(self, methods):
+
+        '''Search every method for its fewest taps and keep the shortest design
+
+        Args:
+            methods (:obj:`list`): design methods to try
+
+        Returns:
+            :obj:`numpy array`: taps
+        '''
+
+        # the Kaiser design is cheap, the optimal ones are only searched below its length
+        best = None
+        for i in sorted(methods, key = lambda m: not m == "kaiser"):
+            limit = constants.FLT_SPEC_MAXTAPS if i == "kaiser" else constants.FLT_SPEC_MAXOPTTAPS
+            if not best is None:
+                limit = min(limit, len(best) - 2)
+            taps = self.__search(i, limit)
+            if not taps is None:
+                best = taps
+
+        if best is None:
+            raise ValueError("No filter of upto %d taps meets the specification" % constants.FLT_SPEC_MAXTAPS)
+        return best
+
+    def __search(self, method, limit):
+
+        '''Find the fewest (odd) number of taps for which a method meets the specification
 
+        Args:
+            method (:obj:`str`): design method
+            limit (:obj:`int`): largest number of taps to try
+
+        Returns:
+            :obj:`numpy array`: taps, None if the method cannot meet the specification
+        '''
+
+        # start from half the Kaiser estimate, double until the specification is met, then bisect down
+        width = min(np.diff(self.__bands)[1::2]) / (0.5 * self.__Fs)
+        estimate = signal.kaiserord(max(self.__attenuation, 21), width)[0]
+        low, high = 1, max(3, estimate // 2)
+        taps = None
+
+        while taps is None:
+            high = min(high, limit)
+            high -= 1 - high % 2
+            if high <= low:
+                return None
+            taps = self.__design(method, high)
+            if taps is None:
+                low, high = high, 2 * high
+
+        while high - low > 2:
+            mid = (low + high) // 2
+            mid += 1 - mid % 2
+            if mid >= high:
+                break
+            candidate = self.__design(method, mid)
+            if candidate is None:
+                low = mid
+            else:
+                high, taps = mid, candidate
+
+        return taps
+
+    def __design(self, method, ntaps):
+
+        '''Design a filter and check it against the specification
+
+        Args:
+            method (:obj:`str`): design method
+            ntaps (:obj:`int`): number of taps, odd
+
+        Returns:
+            :obj:`numpy array`: taps, None if the specification is not met
+        '''
+
+        bands, gains, Fs = self.__bands, self.__gains, self.__Fs
+        passDev = 10 ** (self.__ripple / 20.0) - 1
+        stopDev = 10 ** (-self.__attenuation / 20.0)
+        weight = [1.0 / (passDev if i else stopDev) for i in gains]
+
+        # normalized frequencies (remez takes them relative to Fs, the others to Nyquist), the fs keyword needs scipy 1.2
+        try:
+            if method == "kaiser":
+                beta = signal.kaiser_beta(max(self.__attenuation, -20 * math.log10(passDev)))
+                cutoffs = [(bands[i] + bands[i + 1]) / float(Fs) for i in range(1, len(bands) - 1, 2)]
+                taps = signal.firwin(ntaps, cutoffs, window = ('kaiser', beta), pass_zero = bool(gains[0]))
+            elif method == "remez":
+                taps = signal.remez(ntaps, np.asarray(bands) / float(Fs), gains, weight = weight, maxiter = 100)
+            else:
+                taps = signal.firls(ntaps, np.asarray(bands) / (0.5 * Fs), np.repeat(gains, 2), weight = weight)
+        except ValueError:
+            return None
+
+        # check the response on a grid fine enough to see the ripples
+        # freqz takes fs only since scipy 1.2, the grid in Hz is the one it would give
+        n = 2 ** int(math.ceil(math.log2(max(8192, 16 * ntaps))))
+        h = signal.freqz(taps, worN = n)[1]
+        w = np.linspace(0, 0.5 * Fs, n, endpoint = False)
+        h = np.abs(h)
+        for i in range(len(gains)):
+            band = h[(w >= bands[2 * i]) & (w <= bands[2 * i + 1])]
+            if len(band) == 0:
+                continue
+            if gains[i] and (band.max() > 1 + passDev or band.min() < 1 / (1 + passDev)):
+                return None
+            if not gains[i] and band.max() > stopDev:
+                return None
+
+        return taps
 
 '''
 To be implemented later if needed
@@ -41,11 +41,14 @@ class source(metaclass=ABCMeta):
     # Every source must have a read method
     # Description: read values from 'fromIndex' to 'toIndex'
     # NecessaryInputs: fromIndex
-    # OptionalInputs: toIndex
+    # OptionalInputs: toIndex, out (a complex64 array to read into)
     @abstractmethod
-    def read(self, fromIndex, toIndex):
+    def read(self, fromIndex, toIndex, out):
         pass
 
+    # Sources of 8 bit recordings also provide readRaw
+    # Description: read the unconverted samples from 'fromIndex' to 'toIndex', I and Q interleaved
+
 '''
 An IQ.wav file source, typically an output recorded from SDRSHARP
 The IQ wav file contains two channels, one channel for I component and the other for Q
@@ -92,13 +95,14 @@ class IQwav(source):
 
         return self.__length
 
-    def read(self, fromIndex, toIndex = None):
+    def read(self, fromIndex, toIndex = None, out = None):
 
         '''Read source data
 
         Args:
             fromIndex (:obj:`int`): starting index
             toIndex (:obj:`int`, optional): ending index. If not provided, the element at location given by fromIndex is returned
+            out (:obj:`numpy array`, optional): complex64 array of length (toIndex - fromIndex) to read into, avoids allocating a new array
 
         Returns:
             :obj:`numpy array`: Complex IQ numbers in an array
@@ -114,8 +118,40 @@ class IQwav(source):
         if fromIndex-self.__offset < 0 or toIndex-self.__offset < 0 or fromIndex-self.__offset >= self.length or toIndex-self.__offset > self.length:
             raise ValueError("fromIndex and toIndex have invalid values")
 
-        samples = self.__data[fromIndex:toIndex,0] + 1j * self.__data[fromIndex:toIndex,1]
-        return np.array(samples).astype("complex64") - (127.5 + 1j*127.5)
+        if out is None:
+            out = np.empty(toIndex - fromIndex, dtype = "complex64")
+
+        out.real = self.__data[fromIndex:toIndex,0]
+        out.imag = self.__data[fromIndex:toIndex,1]
+        out -= (127.5 + 1j*127.5)
+        return out
+
+    def readRaw(self, fromIndex, toIndex = None):
+
+        '''Read source data without conversion, for integer processing
+
+        Args:
+            fromIndex (:obj:`int`): starting index
+            toIndex (:obj:`int`, optional): ending index. If not provided, the element at location given by fromIndex is returned
+
+        Returns:
+            :obj:`numpy array`: Unsigned 8 bit samples, I and Q interleaved
+        '''
+
+        fromIndex += self.__offset
+
+        if toIndex == None:
+            toIndex = fromIndex + 1
+        else:
+            toIndex += self.__offset
+
+        if fromIndex-self.__offset < 0 or toIndex-self.__offset < 0 or fromIndex-self.__offset >= self.length or toIndex-self.__offset > self.length:
+            raise ValueError("fromIndex and toIndex have invalid values")
+
+        if not self.__data.dtype == np.uint8:
+            raise TypeError("Only 8 bit recordings can be read raw")
+
+        return self.__data[fromIndex:toIndex].reshape(-1)
 
     def limitData(self, initOffset = None, finalLimit = None):
 
@@ -156,6 +192,7 @@ class IQdat(source):
         self.__offset = 0
         self.__sourceType = constants.SOURCE_IQDAT
         self.memmap = np.memmap(filename)
+        self.__filename = filename
         self.__data = np.memmap(filename)
         self.__length = int(len(self.__data)/2)
         self.__sampFreq = constants.IQ_SDRSAMPRATE
@@ -184,13 +221,14 @@ class IQdat(source):
 
         return self.__length
 
-    def read(self, fromIndex, toIndex = None):
+    def read(self, fromIndex, toIndex = None, out = None):
 
         '''Read source data
 
         Args:
             fromIndex (:obj:`int`): starting index
             toIndex (:obj:`int`, optional): ending index. If not provided, the element at location given by fromIndex is returned
+            out (:obj:`numpy array`, optional): complex64 array of length (toIndex - fromIndex) to read into, avoids allocating a new array
 
         Returns:
             :obj:`numpy array`: Complex IQ numbers in an array
@@ -206,8 +244,48 @@ class IQdat(source):
         if fromIndex-self.__offset < 0 or toIndex-self.__offset < 0 or fromIndex-self.__offset >= self.length or toIndex-self.__offset > self.length:
             raise ValueError("fromIndex and toIndex have invalid values")
             
-        samples = (self.__data[2*fromIndex:2*toIndex:2]) + 1j * (self.__data[1+2*fromIndex:1+2*toIndex:2])
-        return np.array(samples).astype("complex64") - (127.5 + 1j*127.5)
+        if out is None:
+            out = np.empty(toIndex - fromIndex, dtype = "complex64")
+
+        out.real = self.__data[2*fromIndex:2*toIndex:2]
+        out.imag = self.__data[1+2*fromIndex:1+2*toIndex:2]
+        out -= (127.5 + 1j*127.5)
+        return out
+
+    def readRaw(self, fromIndex, toIndex = None):
+
+        '''Read source data without conversion, for integer processing
+
+        Args:
+            fromIndex (:obj:`int`): starting index
+            toIndex (:obj:`int`, optional): ending index. If not provided, the element at location given by fromIndex is returned
+
+        Returns:
+            :obj:`numpy array`: Unsigned 8 bit samples, I and Q interleaved
+        '''
+
+        fromIndex += self.__offset
+
+        if toIndex == None:
+            toIndex = fromIndex + 1
+        else:
+            toIndex += self.__offset
+
+        if fromIndex-self.__offset < 0 or toIndex-self.__offset < 0 or fromIndex-self.__offset >= self.length or toIndex-self.__offset > self.length:
+            raise ValueError("fromIndex and toIndex have invalid values")
+
+        return self.__data[2*fromIndex:2*toIndex]
+
+    def refresh(self):
+
+        '''Map the data written to the file since it was opened, for a recording that is still going on.
+        The length grows with it unless it was limited by limitData
+        '''
+
+        self.__data = np.memmap(self.__filename)
+        if self.__length == self.__actualLength:
+            self.__length = int(len(self.__data)/2)
+        self.__actualLength = int(len(self.__data)/2)
 
     def limitData(self, initOffset = None, finalLimit = None):
 
@@ -249,6 +327,7 @@ class IQwavAlt(source):
 
         self.__offset = 0
         self.__sourceType = constants.SOURCE_IQWAV
+        self.__filename = filename
         self.__data = np.memmap(filename, offset=44)
         self.memmap = np.memmap(filename, offset=44)
         self.__length = int(len(self.__data)/2)
@@ -278,13 +357,14 @@ class IQwavAlt(source):
 
         return self.__length
 
-    def read(self, fromIndex, toIndex = None):
+    def read(self, fromIndex, toIndex = None, out = None):
 
         '''Read source data
 
         Args:
             fromIndex (:obj:`int`): starting index
             toIndex (:obj:`int`, optional): ending index. If not provided, the element at location given by fromIndex is returned
+            out (:obj:`numpy array`, optional): complex64 array of length (toIndex - fromIndex) to read into, avoids allocating a new array
 
         Returns:
             :obj:`numpy array`: Complex IQ numbers in an array
@@ -300,8 +380,48 @@ class IQwavAlt(source):
         if fromIndex-self.__offset < 0 or toIndex-self.__offset < 0 or fromIndex-self.__offset >= self.length or toIndex-self.__offset > self.length:
             raise ValueError("fromIndex and toIndex have invalid values")
             
-        samples = (self.__data[2*fromIndex:2*toIndex:2]) + 1j * (self.__data[1+2*fromIndex:1+2*toIndex:2])
-        return np.array(samples).astype("complex64") - (127.5 + 1j*127.5)
+        if out is None:
+            out = np.empty(toIndex - fromIndex, dtype = "complex64")
+
+        out.real = self.__data[2*fromIndex:2*toIndex:2]
+        out.imag = self.__data[1+2*fromIndex:1+2*toIndex:2]
+        out -= (127.5 + 1j*127.5)
+        return out
+
+    def readRaw(self, fromIndex, toIndex = None):
+
+        '''Read source data without conversion, for integer processing
+
+        Args:
+            fromIndex (:obj:`int`): starting index
+            toIndex (:obj:`int`, optional): ending index. If not provided, the element at location given by fromIndex is returned
+
+        Returns:
+            :obj:`numpy array`: Unsigned 8 bit samples, I and Q interleaved
+        '''
+
+        fromIndex += self.__offset
+
+        if toIndex == None:
+            toIndex = fromIndex + 1
+        else:
+            toIndex += self.__offset
+
+        if fromIndex-self.__offset < 0 or toIndex-self.__offset < 0 or fromIndex-self.__offset >= self.length or toIndex-self.__offset > self.length:
+            raise ValueError("fromIndex and toIndex have invalid values")
+
+        return self.__data[2*fromIndex:2*toIndex]
+
+    def refresh(self):
+
+        '''Map the data written to the file since it was opened, for a recording that is still going on.
+        The length grows with it unless it was limited by limitData
+        '''
+
+        self.__data = np.memmap(self.__filename, offset=44)
+        if self.__length == self.__actualLength:
+            self.__length = int(len(self.__data)/2)
+        self.__actualLength = int(len(self.__data)/2)
 
     def limitData(self, initOffset = None, finalLimit = None):
 
@@ -0,0 +1,82 @@
+'''
+Reusable scratch buffers
+'''
+import numpy as np
+
+'''
+A workspace keeps named scratch buffers alive between chunks
+Stages borrow buffers from it and write into them using numpy's out= parameters,
+this way every chunk reuses the same memory instead of allocating (and page faulting) fresh arrays
+'''
+
+class workspace:
+
+    '''
+    A pool of named, reusable scratch buffers
+    '''
+
+    def __init__(self):
+
+        '''Initialize the object'''
+
+        self.__buffers = {}
+        self.__ramp = np.arange(0, dtype = np.float64)
+        self.__allocations = 0
+        self.__bytesAllocated = 0
+
+    @property
+    def allocations(self):
+
+        ''':obj:`int`: number of times a buffer had to be allocated'''
+
+        return self.__allocations
+
+    @property
+    def bytesAllocated(self):
+
+        ''':obj:`int`: total bytes allocated for buffers'''
+
+        return self.__bytesAllocated
+
+    def get(self, name, size, dtype):
+
+        '''Borrow a buffer, it is reallocated only if it is too small or of a different type
+
+        Args:
+            name (:obj:`str`): name of the buffer, buffers with different names never overlap
+            size (:obj:`int`): number of elements
+            dtype (:obj:`numpy dtype`): data type of the elements
+
+        Returns:
+            :obj:`numpy array`: uninitialized buffer, valid until the same name is borrowed again
+        '''
+
+        dtype = np.dtype(dtype)
+        buf = self.__buffers.get(name)
+
+        if buf is None or not buf.dtype == dtype or len(buf) < size:
+            buf = np.empty(size, dtype = dtype)
+            self.__buffers[name] = buf
+            self.__allocations += 1
+            self.__bytesAllocated += buf.nbytes
+
+        return buf[:size]
+
+    def ramp(self, size):
+
+        '''Get the sequence 0, 1, 2 ... size-1, useful to build oscillators without np.arange every chunk
+
+        Args:
+            size (:obj:`int`): number of elements
+
+        Returns:
+            :obj:`numpy array`: read only float64 array
+        '''
+
+        if len(self.__ramp) < size:
+            self.__ramp = np.arange(size, dtype = np.float64)
+            self.__ramp.flags.writeable = False
+            self.__allocations += 1
+            self.__bytesAllocated += self.__ramp.nbytes
+
+        return self.__ramp[:size]
@@ -274,6 +274,7 @@ for fileIndex in range(len(freqs)):
                 logging.info('No NOAA data was found at this frequency')
 
             entryDict['usefulness'] = noaaObj.useful
+            entryDict['spilledToDisk'] = noaaObj.spilled
             entryDict['syncDetect'] = calculateSync
             entryDict['image'] = calculateImage
 
@@ -288,6 +289,7 @@ for fileIndex in range(len(freqs)):
             print(afskObj.getMsg)
 
             entryDict['usefulness'] = afskObj.useful
+            entryDict['spilledToDisk'] = afskObj.spilled
 
         # if Funcube BPSK was chosen
         elif decoders[fileIndex] == "funcube":
@@ -0,0 +1,112 @@
+'''
+Synthetic recordings shared by the tests
+'''
+
+import numpy as np
+import pytest
+from directdemod import constants
+
+SAMPRATE = 256000 # sampling frequency of the synthetic recordings, enough for the 60 kHz NOAA channel
+OFFSET = 25000 # frequency offset of the carrier in the synthetic recordings
+CHANNELS = [2, 4] # channel IDs sent in the telemetry of the synthetic pass
+
+def aptWords(nlines):
+
+    '''APT words of a synthetic pass: test patterns in both images and the telemetry wedges of CHANNELS
+
+    Args:
+        nlines (:obj:`int`): number of lines
+
+    Returns:
+        :obj:`numpy array`: words scaled to 0..1, 2080 per line
+    '''
+
+    xs = np.arange(909)
+    lines = []
+    for l in range(nlines):
+        wedge = (l // 8) % 16
+
+        def telemetry(ch):
+            if wedge < 8:
+                return np.full(45, (wedge + 1) * 255 / 8.0)
+            if wedge == 8:
+                return np.zeros(45)
+            if wedge == 15:
+                return np.full(45, ch * 255 / 8.0)
+            return np.full(45, 100 + 5.0 * wedge)
+
+        imageA = 128 + 100 * np.sin(2 * np.pi * (xs / 300.0 + l / 50.0))
+        imageB = 128 + 80 * np.cos(2 * np.pi * (xs / 200.0 - l / 70.0))
+        syncA = np.array(constants.NOAA_SYNCA) * 233 + 11
+        syncB = np.array(constants.NOAA_SYNCB) * 233 + 11
+        spaceA = np.full(46, 30.0 if l % 120 else 230.0)
+        spaceB = np.full(46, 30.0)
+        lines.append(np.concatenate([syncA, spaceA, imageA, telemetry(CHANNELS[0]), syncB, spaceB, imageB, telemetry(CHANNELS[1])]))
+
+    return np.concatenate(lines) / 255.0
+
+def writeIQ(fileName, iq):
+
+    '''Write complex samples as an 8 bit IQ.dat file
+
+    Args:
+        fileName (:obj:`str`): file name
+        iq (:obj:`numpy array`): complex samples, at most about 127 in magnitude
+    '''
+
+    out = np.empty(2 * len(iq), dtype = np.uint8)
+    out[0::2] = np.clip(np.round(iq.real + 127.5), 0, 255)
+    out[1::2] = np.clip(np.round(iq.imag + 127.5), 0, 255)
+    out.tofile(fileName)
+
+def aptIQ(fileName, seconds, lead = 0.37, drift = 1e-5, snr = 30):
+
+    '''Write a synthetic NOAA pass: APT on a 2400 Hz subcarrier, FM modulated at OFFSET Hz, at SAMPRATE
+
+    Args:
+        fileName (:obj:`str`): file name
+        seconds (:obj:`float`): length of the recording
+        lead (:obj:`float`): time of the first word in seconds
+        drift (:obj:`float`): relative error of the word rate
+        snr (:obj:`float`): signal to noise ratio in dB
+    '''
+
+    words = aptWords(int(seconds * 2) + 2)
+    t = np.arange(int(seconds * SAMPRATE)) / float(SAMPRATE)
+    wordPosition = (t - lead) * 4160 * (1 + drift)
+    envelope = np.interp(wordPosition, np.arange(len(words)), words, left = 0.5, right = 0.5)
+    audio = (0.1 + 0.9 * envelope) * np.sin(2 * np.pi * 2400 * t)
+
+    phase = 2 * np.pi * (np.cumsum(17000 * audio) / SAMPRATE + OFFSET * t)
+    rs = np.random.RandomState(1)
+    iq = np.exp(1j * phase) + (rs.standard_normal(len(t)) + 1j * rs.standard_normal(len(t))) * 10**(-snr / 20.0)
+    writeIQ(fileName, 90 * iq)
+
+@pytest.fixture(scope = "session")
+def shortPass(tmpdir_factory):
+
+    '''A 25 s synthetic pass, too short for a telemetry frame'''
+
+    fileName = str(tmpdir_factory.mktemp("iq").join("short.dat"))
+    aptIQ(fileName, 25)
+    return fileName
+
+@pytest.fixture(scope = "session")
+def framePass(tmpdir_factory):
+
+    '''A 70 s synthetic pass, it holds a full telemetry frame'''
+
+    fileName = str(tmpdir_factory.mktemp("iq").join("frame.dat"))
+    aptIQ(fileName, 70)
+    return fileName
+
+@pytest.fixture(scope = "session")
+def noise(tmpdir_factory):
+
+    '''12 s of noise only'''
+
+    fileName = str(tmpdir_factory.mktemp("iq").join("noise.dat"))
+    rs = np.random.RandomState(0)
+    n = 12 * SAMPRATE
+    writeIQ(fileName, 30 * (rs.standard_normal(n) + 1j * rs.standard_normal(n)))
+    return fileName
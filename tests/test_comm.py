@@ -0,0 +1,52 @@
+'''
+Tests of the signal utilities
+'''
+
+import numpy as np
+import pytest
+from directdemod import comm, chunker
+
+class arraySource:
+
+    '''Minimal source of a numpy array, to be chunked'''
+
+    def __init__(self, sig):
+        self.sig = sig
+        self.length = len(sig)
+
+def translate(sig, Fs, offset, chunkSize):
+
+    '''Offset a signal chunk by chunk, offset is a frequency or one frequency per sample'''
+
+    chunkerObj = chunker.chunker(arraySource(sig), chunkSize)
+    out = []
+    for start, end in chunkerObj.getChunks:
+        chunkOffset = offset if np.isscalar(offset) else offset[start:end]
+        out.append(comm.commSignal(Fs, sig[start:end].copy(), chunkerObj).offsetFreq(chunkOffset).signal.copy())
+    return np.concatenate(out)
+
+@pytest.mark.parametrize("chunkSize", [10007, 65536 + 123, 10**6])
+def test_offsetFreq(chunkSize):
+
+    '''A tone translated to 0 Hz chunk by chunk is a constant, for a fixed offset and for a per sample doppler correction'''
+
+    Fs, n = 48000, 200000
+    t = np.arange(n) / float(Fs)
+
+    # fixed offset
+    out = translate(np.exp(2j * np.pi * 3210.5 * t), Fs, 3210.5, chunkSize)
+    assert np.max(np.abs(out - out[0])) < 1e-6
+
+    # the frequency of the tone drifts by 2 kHz, the correction follows it sample by sample
+    freq = 3000 + 2000 * t / t[-1]
+    tone = np.exp(2j * np.pi * np.concatenate([[0], np.cumsum(freq[:-1])]) / Fs)
+    out = translate(tone, Fs, freq, chunkSize)
+    assert np.max(np.abs(out - out[0])) < 1e-6
+
+    # all of the power is at 0 Hz
+    spectrum = np.abs(np.fft.fft(out))**2
+    assert spectrum[0] / np.sum(spectrum) > 1 - 1e-9
+
+    # the same without chunks
+    whole = comm.commSignal(Fs, tone.copy()).offsetFreq(freq).signal
+    assert np.allclose(whole, out)
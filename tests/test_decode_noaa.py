@@ -0,0 +1,144 @@
+'''
+Tests of the NOAA decoder
+'''
+
+import numpy as np
+import collections
+from directdemod import source, decode_noaa, constants
+from conftest import SAMPRATE, OFFSET, CHANNELS
+
+def decoder(fileName):
+
+    '''Decoder of a synthetic recording'''
+
+    return decode_noaa.decode_noaa(source.IQdat(fileName, SAMPRATE), OFFSET)
+
+def test_usefulNoise(noise):
+
+    '''A recording without an APT signal is reported as not useful, whether syncs are tracked or searched'''
+
+    assert decoder(noise).useful == 0
+
+    noaa = decoder(noise)
+    noaa.getCrudeSync(tracking = False)
+    assert noaa.useful == 0
+
+def test_calibration(framePass):
+
+    '''The telemetry frame of a pass gives the channel IDs and calibrates the wedges to their levels'''
+
+    noaa = decoder(framePass)
+    image = noaa.getImage
+
+    assert noaa.channelID == CHANNELS
+
+    # the synthetic pass starts with a frame, wedges 1 to 8 step up to white and wedge 9 is black
+    telemetry = np.median(image[:, 1040 - 45:1040], axis = -1)
+    wedges = np.median(telemetry[:72].reshape(9, 8), axis = -1)
+    assert np.allclose(wedges, np.append(np.arange(1, 9), 0) * 255 / 8.0, atol = 3)
+
+def test_calibrationShortPass(shortPass):
+
+    '''Without a full telemetry frame the channel IDs are unknown and the sync levels calibrate the image'''
+
+    noaa = decoder(shortPass)
+    image = noaa.getImage
+
+    assert noaa.channelID == [None, None]
+    assert abs(np.median(image[:, 1040 - 45:1040][:8]) - 255 / 8.0) < 8
+
+def test_getLines(shortPass):
+
+    '''The streamed lines are the rows of the image, up to the causal filters and the line by line placement of the stream'''
+
+    lines = np.array(list(decoder(shortPass).getLines())).astype(int)
+    image = decoder(shortPass).getImage.astype(int)
+
+    assert lines.shape == image.shape
+
+    # sync pulses are one word long and differ with the placement, the images of both channels agree
+    for channel in [slice(86, 1040 - 45), slice(1040 + 86, 2080 - 45)]:
+        difference = np.abs(lines[:, channel] - image[:, channel])
+        assert np.mean(difference) < 2
+        assert np.percentile(difference, 99) <= 4
+
+def test_lineTiming(noise):
+
+    '''The line timing fitted to jittered syncs with a drifting period places every line, missed ones included, and leaves outliers out'''
+
+    sampRate = 20800
+    period = 0.5 * sampRate * (1 + 3e-4)
+    timing = lambda line: 1234.5 + period * line + 0.005 * line**2
+    lines = np.arange(120)
+
+    rs = np.random.RandomState(2)
+    missed = np.array([10, 11, 50, 97])
+    found = np.setdiff1d(lines, missed)
+    syncA = timing(found) + rs.uniform(-0.3, 0.3, len(found))
+    syncB = timing(found + 0.5) + rs.uniform(-0.3, 0.3, len(found))
+
+    # false syncs far from the line timing
+    syncA = np.concatenate([syncA, timing(np.array([20.3, 70.6]))])
+    syncB = np.concatenate([syncB, timing(np.array([33.1]))])
+
+    startA, startB, endB, detected = decoder(noise)._decode_noaa__lineTiming(syncA, syncB, int(timing(120) + 5000), sampRate)
+
+    assert len(startA) == len(lines)
+    assert np.max(np.abs(startA - timing(lines))) < 0.2
+    assert np.max(np.abs(startB - timing(lines + 0.5))) < 0.2
+    assert np.max(np.abs(endB - timing(lines + 1))) < 0.2
+    assert np.array_equal(np.flatnonzero(~detected), missed)
+
+def counted(monkeypatch, name):
+
+    '''Count the calls of a method of decode_noaa'''
+
+    calls = collections.Counter()
+    method = getattr(decode_noaa.decode_noaa, name)
+
+    def wrapper(self, *args, **kwargs):
+        calls[name] += 1
+        return method(self, *args, **kwargs)
+
+    monkeypatch.setattr(decode_noaa.decode_noaa, name, wrapper)
+    return calls
+
+def test_products(shortPass, monkeypatch):
+
+    '''The source is read and FM demodulated once, for the syncs, the image and the audio'''
+
+    calls = counted(monkeypatch, "_decode_noaa__fmDemod")
+
+    noaa = decoder(shortPass)
+    noaa.getCrudeSync()
+    noaa.getAccurateSync()
+    image = noaa.getImage
+    noaa.getAudio
+
+    assert noaa.getImage is image
+    assert calls["_decode_noaa__fmDemod"] == 1
+
+def test_falseColorTables(noise, monkeypatch):
+
+    '''The table of a palette is made once for all decoders, the image of a palette once per decoder'''
+
+    monkeypatch.setattr(decode_noaa, "_colorTables", {})
+    calls = counted(monkeypatch, "_decode_noaa__colorTable")
+    image = np.random.RandomState(3).randint(0, 256, (6, 2080)).astype(np.uint8)
+
+    first, second = decoder(noise), decoder(noise)
+    first._decode_noaa__image = image
+    second._decode_noaa__image = image
+
+    color = first.getFalseColor("default")
+    assert color.shape == (6, 1040, 3) and color.dtype == np.uint8
+    assert first.getColor is color
+    assert np.array_equal(second.getFalseColor("default"), color)
+    assert calls["_decode_noaa__colorTable"] == 1
+
+    # every pixel is the table entry of its visible and temperature values
+    table = decode_noaa._colorTables[repr(sorted(constants.NOAA_COLORPALETTES["default"].items()))]
+    assert np.array_equal(color, table[image[:, :1040], image[:, 1040:]])
+
+    second.getFalseColor("warm")
+    assert calls["_decode_noaa__colorTable"] == 2
@@ -0,0 +1,84 @@
+'''
+Tests of the demodulators
+'''
+
+import numpy as np
+import pytest
+import tracemalloc
+from directdemod import demod_am, demod_fm, constants
+
+def test_demod_apt():
+
+    '''The product detector gives the envelope of a 2400 Hz subcarrier, as the rectifier and low pass does'''
+
+    Fs, seconds = 20800, 3
+    t = np.arange(Fs * seconds) / float(Fs)
+    envelope = 1 + 0.5 * np.sin(2 * np.pi * 5 * t)
+    sig = envelope * np.sin(2 * np.pi * constants.AM_APT_CARRIER * t + 0.3)
+
+    apt = demod_am.demod_apt(Fs)
+    out = np.concatenate([apt.demod(sig[:Fs]), apt.demod(sig[Fs:]), apt.flush()])[apt.delay:]
+    assert apt.sampRate == 4160 * constants.NOAA_IMAGEOVERSAMPLE
+    assert len(out) == int(round(len(sig) * apt.sampRate / Fs))
+
+    # the mean of a rectified sine is 2/pi of its peak
+    rectified = demod_am.demod_amFLT(Fs, 1000).demod(sig) * np.pi / 2
+    reference = np.interp(np.arange(len(out)) / apt.sampRate, t, rectified)
+
+    inner = slice(len(out) // 6, -len(out) // 6)
+    assert np.max(np.abs(out[inner] - reference[inner])) < 0.03
+    assert np.max(np.abs(out[inner] - np.interp(np.arange(len(out)) / apt.sampRate, t, envelope)[inner])) < 0.002
+
+def test_fastAtan2():
+
+    '''The polynomial arctangent is within 1.2e-5 radians of arctan2 all around the circle and at any scale'''
+
+    theta = np.linspace(-np.pi, np.pi, 1000001)
+    for radius in [1e-3, 1, 1e3]:
+        y, x = (radius * np.sin(theta)).astype(np.float32), (radius * np.cos(theta)).astype(np.float32)
+        angle = demod_fm.fastAtan2(y, x)
+        error = np.abs(angle - np.arctan2(y.astype(float), x.astype(float)))
+        assert angle.dtype == np.float32
+        assert np.max(np.minimum(error, 2 * np.pi - error)) <= 1.2e-5
+
+    assert np.all(demod_fm.fastAtan2(np.zeros(2), np.array([0.0, 1.0])) == 0)
+
+@pytest.mark.parametrize("fastAtan", [False, True])
+def test_demod_fmChunks(fastAtan):
+
+    '''Chunk by chunk, the discriminator gives what it gives for the whole signal, including the samples across the boundaries'''
+
+    rng = np.random.RandomState(4)
+    phase = np.cumsum(rng.uniform(-2, 2, 100000))
+    sig = np.exp(1j * phase).astype(np.complex64)
+
+    whole = demod_fm.demod_fm(fastAtan = fastAtan).demod(sig)
+    demodulator = demod_fm.demod_fm(fastAtan = fastAtan)
+    chunks = [demodulator.demod(sig[i:i + 7777]) for i in range(0, len(sig), 7777)]
+
+    assert [len(i) for i in chunks] == [7776] + [len(sig[i:i + 7777]) for i in range(7777, len(sig), 7777)]
+    assert np.array_equal(np.concatenate(chunks), whole)
+    assert whole.dtype == np.float32
+    assert np.max(np.abs(whole - np.diff(phase).astype(np.float32))) < (1.2e-5 if fastAtan else 1e-5)
+
+@pytest.mark.parametrize("fastAtan", [False, True])
+def test_demod_fmAllocations(fastAtan):
+
+    '''With an output array, once the buffers fit a chunk (the first one is a sample short) nothing of its size is allocated'''
+
+    n = 100000
+    sig = np.exp(1j * np.cumsum(np.random.RandomState(5).uniform(-2, 2, 5 * n))).astype(np.complex64)
+    out = np.empty(n, dtype = np.float32)
+    demodulator = demod_fm.demod_fm(fastAtan = fastAtan)
+    demodulator.demod(sig[:n], out = out)
+    demodulator.demod(sig[n:2 * n], out = out)
+
+    tracemalloc.start()
+    try:
+        for i in range(2 * n, len(sig), n):
+            demodulator.demod(sig[i:i + n], out = out)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert peak < n
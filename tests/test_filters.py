@@ -0,0 +1,210 @@
+'''
+Tests of the filters
+'''
+
+import numpy as np
+import threading
+import scipy.signal as signal
+import pytest
+from directdemod import filters, constants
+
+@pytest.mark.parametrize("n", [40, 100, 1000, 50000, constants.FLT_ZEROPHASE_BLOCKSIZE, constants.FLT_ZEROPHASE_BLOCKSIZE + 7, 3 * constants.FLT_ZEROPHASE_BLOCKSIZE + 123])
+def test_zeroPhaseStream(n):
+
+    '''The streaming forward-backward filter gives what filtfilt gives, for streams shorter and longer than a block'''
+
+    b, a = signal.butter(4, [0.05, 0.3], 'bandpass')
+    x = np.random.RandomState(n).standard_normal(n)
+    y = filters.zeroPhaseStream(b, a).applyOn(x)
+    ref = signal.filtfilt(b, a, x)
+
+    assert len(y) == n
+    assert np.max(np.abs(y - ref)) <= constants.FLT_ZEROPHASE_TOLERANCE * np.max(np.abs(ref)) * 10
+
+@pytest.mark.parametrize("n", [100, 1000, constants.FLT_ZEROPHASE_BLOCKSIZE, 3 * constants.FLT_ZEROPHASE_BLOCKSIZE + 123])
+def test_zeroPhaseStreamSos(n):
+
+    '''In second order sections the streaming filter gives what sosfiltfilt gives'''
+
+    sos = signal.butter(6, [0.02, 0.2], 'bandpass', output = 'sos')
+    x = np.random.RandomState(n).standard_normal(n)
+    y = filters.zeroPhaseStream(sos = sos).applyOn(x)
+    ref = signal.sosfiltfilt(sos, x)
+
+    assert len(y) == n
+    assert np.max(np.abs(y - ref)) <= constants.FLT_ZEROPHASE_TOLERANCE * np.max(np.abs(ref)) * 10
+
+@pytest.mark.parametrize("n", [10, 5000, 300000])
+def test_overlapSave(n):
+
+    '''FFT convolution in chunks gives what lfilter gives, for real and complex signals'''
+
+    b = signal.firwin(301, 0.1)
+    rng = np.random.RandomState(n)
+    for x in [rng.standard_normal(n), rng.standard_normal(n) + 1j * rng.standard_normal(n)]:
+        engine = filters.overlapSave(b)
+        y = np.concatenate([engine.applyOn(x[:n // 3]), engine.applyOn(x[n // 3:])])
+        assert np.allclose(y, signal.lfilter(b, [1], x))
+
+def test_correlator():
+
+    '''Correlation with several templates gives what signal.correlate gives'''
+
+    rng = np.random.RandomState(0)
+    x = rng.standard_normal(200000)
+    needles = [rng.standard_normal(40), rng.standard_normal(117)]
+    cors = filters.correlator(needles, normalize = False).applyOn(x)
+    for cor, needle in zip(cors, needles):
+        assert np.allclose(cor, signal.correlate(x, needle, mode = 'same'))
+
+def test_correlatorSilence():
+
+    '''Normalized correlation is 0 over silence and zero padding, and finite everywhere'''
+
+    rng = np.random.RandomState(1)
+    needle = rng.standard_normal(64)
+    x = np.zeros(100000)
+    x[20000:20064] = needle
+    x[50000:60000] = 1e-3 * rng.standard_normal(10000)
+    cor, = filters.correlator([needle]).applyOn(x)
+
+    assert np.all(np.isfinite(cor))
+    assert np.all(np.abs(cor) <= 1)
+    assert np.argmax(cor) == 20032 and cor[20032] > 1 - 1e-9
+    assert np.all(cor[:19000] == 0) and np.all(cor[21000:49000] == 0) and np.all(cor[61000:] == 0)
+
+def test_designCacheThreads():
+
+    '''Concurrent lookups of an LRU cache smaller than the set of keys keep it consistent'''
+
+    cache = filters.designCache(maxEntries = 4, directory = None)
+    errors = []
+
+    def worker(seed):
+        rs = np.random.RandomState(seed)
+        try:
+            for k in rs.randint(0, 16, 2000):
+                assert cache.get(("key", int(k)), lambda: (np.array([k]),))[0][0] == k
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target = worker, args = (i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert cache.hits + cache.misses == 8 * 2000
+
+def meetsSpec(taps, Fs, passband, stopband, ripple, attenuation):
+
+    '''Check a low pass filter against its specification on a fine grid'''
+
+    w, h = signal.freqz(taps, worN = 2**15)
+    f = w * Fs / (2 * np.pi)
+    gain = 20 * np.log10(np.abs(h) + 1e-30)
+    return np.all(np.abs(gain[f <= passband]) <= ripple) and np.all(gain[f >= stopband] <= -attenuation)
+
+@pytest.mark.parametrize("method", [None, "kaiser", "remez", "firls"])
+def test_minimumFir(method):
+
+    '''Designs meet the ripple and attenuation of the specification, by default with the fewest taps of all methods'''
+
+    Fs, cutoff, transition, ripple, attenuation = 48000, 3000, 1000, 0.1, 60
+    flt = filters.minimumFir(Fs, cutoff, transition, ripple = ripple, attenuation = attenuation, method = method)
+
+    assert flt.ntaps % 2 == 1
+    assert meetsSpec(flt.getB, Fs, cutoff, cutoff + transition, ripple, attenuation)
+
+    if method is None:
+        assert flt.ntaps == min(filters.minimumFir(Fs, cutoff, transition, ripple = ripple, attenuation = attenuation, method = i).ntaps for i in ["kaiser", "remez", "firls"])
+
+    # the Kaiser design is the shortest one of its kind
+    if method == "kaiser":
+        beta = signal.kaiser_beta(attenuation)
+        shorter = signal.firwin(flt.ntaps - 2, (2 * cutoff + transition) / float(Fs), window = ('kaiser', beta))
+        assert not meetsSpec(shorter, Fs, cutoff, cutoff + transition, ripple, attenuation)
+
+@pytest.mark.parametrize("up, down", [(1, 1), (3, 1), (1, 4), (13, 5), (4, 13)])
+def test_resampler(up, down):
+
+    '''Resampling chunk by chunk gives what upfirdn gives for the whole signal'''
+
+    b = up * signal.firwin(10 * max(up, down) + 1, 0.8 / max(up, down))
+    x = np.random.RandomState(up * 100 + down).standard_normal(5000)
+    resampler = filters.resampler(b, up, down)
+    y = np.concatenate([resampler.applyOn(x[i:i + 777]) for i in range(0, len(x), 777)])
+    ref = signal.upfirdn(b, x, up, down)
+
+    assert len(y) == -(-len(x) * up // down)
+    assert np.allclose(y, ref[:len(y)])
+
+def test_filterState():
+
+    '''State carried across chunks gives what a one shot lfilter gives, for one stream and for many streams at once'''
+
+    b, a = signal.butter(4, 0.1)
+    rng = np.random.RandomState(2)
+    x = rng.standard_normal((3, 10000))
+    ref = signal.lfilter(b, a, x, axis = 1)
+
+    design = filters.filterDesign(b, a)
+    states = [design.newState(steady = False) for i in range(3)]
+    chunks = [0, 1, 999, 4000, 4000, 10000]
+
+    # one stream
+    y = np.concatenate([design.applyOn(states[0], x[0, i:j]) for i, j in zip(chunks[:-1], chunks[1:])])
+    assert np.allclose(y, ref[0])
+
+    # all streams in one call, equal and unequal lengths
+    for state in states:
+        state.reset()
+    y = np.concatenate([design.apply(states, x[:, i:j]) for i, j in zip(chunks[:-1], chunks[1:])], axis = 1)
+    assert np.allclose(y, ref)
+    for state in states:
+        state.reset()
+    y = design.apply(states, [x[0, :10], x[1, :20], x[2, :30]])
+    y = [np.concatenate([y[k], design.applyOn(states[k], x[k, 10 * (k + 1):])]) for k in range(3)]
+    assert np.allclose(np.array(y), ref)
+
+def test_filterChunks():
+
+    '''A stateful filter runs its stream through its design, chunk by chunk as in one pass from steady state'''
+
+    b, a = signal.butter(6, 0.2)
+    x = np.random.RandomState(3).standard_normal(10000)
+    flt = filters.butter(1000, 100)
+    ref = signal.lfilter(b, a, x, zi = signal.lfilter_zi(b, a))[0]
+
+    assert np.allclose(np.concatenate([flt.applyOn(x[i:i + 777]) for i in range(0, len(x), 777)]), ref)
+    assert np.allclose(flt.design.getB, b) and np.allclose(flt.design.getA, a)
+
+@pytest.mark.parametrize("decimation, order", [(1, 1), (4, 2), (17, 3), (32, 4)])
+def test_intFrontEnd(decimation, order):
+
+    '''The integer front end gives what a float mixer and decimator give, upto the quantization of its NCO'''
+
+    Fs, offset, n = 2048000, 25000, 3 * constants.PROC_BLOCKSIZE + 1001
+    rng = np.random.RandomState(decimation)
+    t = np.arange(n)
+    iq = 100 * np.exp(2j * np.pi * (offset + 3000) * t / Fs) + 10 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+    raw = np.empty(2 * n, dtype = np.uint8)
+    raw[0::2] = np.clip(np.round(iq.real + 127.5), 0, 255)
+    raw[1::2] = np.clip(np.round(iq.imag + 127.5), 0, 255)
+
+    frontEnd = filters.intFrontEnd(Fs, offset, decimation, order)
+    y = np.concatenate([frontEnd.applyOn(raw[i:i + 2 * 12345]) for i in range(0, 2 * n, 2 * 12345)])
+
+    x = ((raw[0::2] - 127.5) + 1j * (raw[1::2] - 127.5)) * np.exp(-2j * np.pi * frontEnd.offset * t / Fs)
+    cic = np.ones(1)
+    for i in range(order):
+        cic = np.convolve(cic, np.ones(decimation) / decimation)
+    ref = filters.decimator(cic, decimation).applyOn(x)
+
+    assert abs(frontEnd.offset - offset) < Fs / float(constants.FLT_INTFRONTEND_NCOSIZE)
+    assert len(y) == len(ref) == -(-n // decimation)
+    # every table entry is within half a level of 127
+    assert np.max(np.abs(y - ref)) < 2**0.5 * 0.5 / 127 * np.max(np.abs(x))
+    if decimation > 1:
+        assert np.max(np.abs(y - ref)) < 3e-3 * np.max(np.abs(x))